@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import uuid
+import zlib
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Analysis store configuration
+ANALYSIS_DB_PATH = os.getenv('ANALYSIS_DB', 'analyses.db')
+ANALYSIS_TTL = float(os.getenv('ANALYSIS_TTL_SECONDS', '86400'))
+# Expired analyses are deleted after every this many saves
+PURGE_EVERY = 500
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+class AnalysisStore:
+    """Analysis results by id in a SQLite file shared by every worker.
+
+    Each analysis keeps its result, as served to the client, and the stage
+    snapshot that incremental re-analysis starts from. Both are stored as
+    compressed JSON and expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._saves = 0
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS analyses ('
+                'id TEXT PRIMARY KEY, result BLOB NOT NULL, snapshot BLOB, '
+                'created_at REAL NOT NULL, expires_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS analyses_expiry ON analyses (expires_at)')
+        self.purge_expired()
+
+    def _connect(self):
+        # sqlite3 connections must not be shared between threads or processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def save(self, result, snapshot=None):
+        """Store an analysis and return its new id"""
+        analysis_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO analyses (id, result, snapshot, created_at, expires_at) VALUES (?, ?, ?, ?, ?)',
+                (analysis_id, _pack(result), _pack(snapshot) if snapshot is not None else None, now, now + self.ttl)
+            )
+        self._saves += 1
+        if self._saves % PURGE_EVERY == 0:
+            self.purge_expired()
+        return analysis_id
+
+    def _load(self, column, analysis_id):
+        row = self._connect().execute(
+            f'SELECT {column}, expires_at FROM analyses WHERE id = ?', (analysis_id,)
+        ).fetchone()
+        if row is None or row[0] is None or row[1] < time.time():
+            return None
+        return _unpack(row[0])
+
+    def get(self, analysis_id):
+        """The stored result of an analysis, or None if it is unknown or expired"""
+        return self._load('result', analysis_id)
+
+    def get_snapshot(self, analysis_id):
+        """The incremental stage snapshot of an analysis, or None"""
+        return self._load('snapshot', analysis_id)
+
+    def purge_expired(self):
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM analyses WHERE expires_at < ?', (time.time(),)).rowcount
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM analyses').fetchone()[0]
+
+
+_store = AnalysisStore(ANALYSIS_DB_PATH, ANALYSIS_TTL)
+
+_stats_lock = threading.Lock()
+_stats = {'saves': 0, 'hits': 0, 'misses': 0, 'errors': 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def save(result, snapshot=None):
+    """Store an analysis, returning its id, or None if the store is unavailable"""
+    try:
+        analysis_id = _store.save(result, snapshot)
+    except sqlite3.Error as e:
+        _count('errors')
+        logger.error("Saving analysis failed: %s", e)
+        return None
+    _count('saves')
+    return analysis_id
+
+
+def _lookup(load, analysis_id):
+    if not isinstance(analysis_id, str):
+        return None
+    try:
+        value = load(analysis_id)
+    except sqlite3.Error as e:
+        _count('errors')
+        logger.error("Loading analysis %s failed: %s", analysis_id, e)
+        return None
+    _count('hits' if value is not None else 'misses')
+    return value
+
+
+def get(analysis_id):
+    """Result of a stored analysis, or None"""
+    return _lookup(_store.get, analysis_id)
+
+
+def get_snapshot(analysis_id):
+    """Incremental snapshot of a stored analysis, or None"""
+    return _lookup(_store.get_snapshot, analysis_id)
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    try:
+        stats['stored'] = _store.count()
+    except sqlite3.Error:
+        stats['stored'] = None
+    stats['ttl_seconds'] = ANALYSIS_TTL
+    stats['path'] = ANALYSIS_DB_PATH
+    return stats
@@ -1,161 +1,586 @@
-from flask import Flask, render_template, request, jsonify, send_file
-import requests
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
+import json
+import threading
+import time
+from concurrent.futures import Future, wait, FIRST_COMPLETED
 import os
 from dotenv import load_dotenv
 import logging
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
 import io
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
+# Load environment variables before the modules below read their configuration
 load_dotenv()
 
+# Configure logging, see logging_config.py for the levels and redaction. Only
+# entry points do; code importing the app keeps its own logging setup.
+import logging_config
+if __name__ == '__main__':
+    logging_config.configure()
+
+from executor import new_deadline, submit, gather, failed_future, combine
+from batching import get_batcher, get_stats as get_batching_stats
+from inference_client import get_stats as get_inference_stats
+from backends import BACKEND_MODE, create_backend, local_backend
+from rules import scan_profile, STRENGTHS, IMPROVEMENTS, SUGGESTIONS
+from rules import SCORE_REQUIREMENTS, FINDING_POINTS, MAX_FINDING_POINTS, MAX_SCORE
+from bulk_analysis import ORDERS, read_profiles, analyze_many
+from jobs import JobQueue, QueueFull
+from incremental import KEYWORD_STAGES
+import incremental
+import pdf_report
+import analysis_store
+import inference_cache
+import model_registry
+import metrics
+import text_chunking
+import rate_limiter
+
 app = Flask(__name__)
 
 # HuggingFace API configuration
 HUGGINGFACE_API_KEY = os.getenv('HUGGINGFACE_API_KEY')
-API_URL = "https://api-inference.huggingface.co/models"
+
+# Inference backend configuration
+backend = create_backend(BACKEND_MODE, HUGGINGFACE_API_KEY)
+logger.info("Inference backend: %s", BACKEND_MODE)
+
+# Background analysis jobs, see jobs.py for their configuration
+job_queue = JobQueue(lambda data, progress: run_batch_analysis(data, progress))
+
+# Analysis stages backed by model calls, see incremental.STAGE_GRAPH
+MODEL_STAGES = (*KEYWORD_STAGES, 'summary', 'sentiment')
+
+# Sentiment assumed until (or unless) the sentiment model answers
+NEUTRAL_SENTIMENT = 3.0
+
+# Sections every submitted profile must have
+PROFILE_FIELDS = ('headline', 'summary', 'experience', 'skills', 'education')
+
+# Registry task used for each model-backed stage of the analysis
+TASK_MODELS = {
+    'summary': 'summarization',
+    'sentiment': 'sentiment',
+}
 
 # Log the API key status (but not the actual key)
-logger.info(f"HuggingFace API Key configured: {'Yes' if HUGGINGFACE_API_KEY else 'No'}")
+logger.info("HuggingFace API Key configured: %s", 'Yes' if HUGGINGFACE_API_KEY else 'No')
+
+@app.before_request
+def start_request_metrics():
+    request.started_at = time.perf_counter()
+    metrics.start_request()
+
+@app.after_request
+def record_request_metrics(response):
+    duration = time.perf_counter() - request.started_at
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.observe('http_request_duration_seconds', duration, endpoint=endpoint, method=request.method)
+    metrics.inc('http_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+    # Streamed responses only carry the spans that finished before the first byte
+    response.headers['Server-Timing'] = metrics.server_timing(metrics.request_spans(), duration)
+    return response
 
 @app.route('/')
 def home():
     return render_template('index.html')
 
+@app.route('/stats')
+def stats():
+    return jsonify({
+        'inference_client': get_inference_stats(),
+        'inference_cache': inference_cache.get_stats(),
+        'batching': get_batching_stats(),
+        'jobs': job_queue.get_stats(),
+        'analysis_store': analysis_store.get_stats(),
+        'pdf': pdf_report.get_stats(),
+        'models': model_registry.get_stats(),
+        'stages': metrics.get_stats(),
+        'logging': logging_config.get_stats(),
+        'rate_limit': rate_limiter.get_stats()
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache/<path:model_name>', methods=['DELETE'])
+def invalidate_cache(model_name):
+    removed = inference_cache.invalidate_model(model_name)
+    return jsonify({'model': model_name, 'removed': removed})
+
 @app.route('/analyze', methods=['POST'])
 def analyze_profile():
     try:
         data = request.get_json()
-        logger.debug(f"Received data: {data}")
+        logger.debug("Received profile: %s", data)
         
-        if not HUGGINGFACE_API_KEY:
+        # The local backends can answer without the HuggingFace API
+        if not HUGGINGFACE_API_KEY and BACKEND_MODE == 'remote':
             logger.error("HuggingFace API key not found in environment variables")
             return jsonify({'error': 'API key not configured'}), 500
         
-        # Combine all text fields for analysis with better formatting
-        combined_text = f"""
-        Headline: {data['headline']}
-        Summary: {data['summary']}
-        Experience: {data['experience']}
-        Skills: {data['skills']}
-        Education: {data['education']}
-        """
+        return jsonify(run_analysis(data))
         
-        # Text summarization
+    except Exception as e:
+        logger.error("Error in analyze_profile: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Analyze a JSON lines body of profiles, streaming one JSON line per result"""
+    if not HUGGINGFACE_API_KEY and BACKEND_MODE == 'remote':
+        logger.error("HuggingFace API key not found in environment variables")
+        return jsonify({'error': 'API key not configured'}), 500
+    
+    order = request.args.get('order', 'completion')
+    if order not in ORDERS:
+        return jsonify({'error': f"order must be one of {', '.join(ORDERS)}"}), 400
+    
+    # Profiles are read from the body as they are needed rather than all at once
+    outcomes = analyze_many(read_profiles(request.stream), run_batch_analysis, order)
+    lines = (json.dumps(outcome) + '\n' for outcome in outcomes)
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an analysis to run in the background and return its job id straight away"""
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a profile object'}), 400
+    missing = [field for field in PROFILE_FIELDS if field not in data]
+    if missing:
+        return jsonify({'error': f"Missing profile fields: {', '.join(missing)}"}), 400
+    
+    if not HUGGINGFACE_API_KEY and BACKEND_MODE == 'remote':
+        logger.error("HuggingFace API key not found in environment variables")
+        return jsonify({'error': 'API key not configured'}), 500
+    
+    try:
+        job_id = job_queue.submit(data)
+    except QueueFull as e:
+        logger.warning("Rejecting job: %s", e)
+        response = jsonify({'error': 'Too many pending jobs, try again later'})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+    
+    response = jsonify({'job_id': job_id, 'status': 'queued'})
+    response.headers['Location'] = f"/jobs/{job_id}"
+    return response, 202
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_profile_stream():
+    """Server-Sent Events version of /analyze that sends each part as soon as it is ready"""
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a profile object'}), 400
+    
+    if not HUGGINGFACE_API_KEY and BACKEND_MODE == 'remote':
+        logger.error("HuggingFace API key not found in environment variables")
+        return jsonify({'error': 'API key not configured'}), 500
+    
+    def events():
         try:
-            summary_response = analyze_text(combined_text, "facebook/bart-large-cnn")
-            summary = summary_response[0]['summary_text']
+            for event, payload in stream_analysis(data):
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
         except Exception as e:
-            logger.error(f"Summarization failed: {str(e)}")
-            summary = "Unable to generate summary"
-        
-        # Keyword extraction with multiple models
-        keywords = set()
-        try:
-            # Try multiple keyword extraction models
-            models = [
-                "yanekyuk/bert-uncased-keyword-extractor",
-                "mrm8488/bert-tiny2-finetuned-keyword-extraction",
-                "yanekyuk/bert-uncased-keyword-extractor"
-            ]
-            
-            # Extract keywords from each section separately
-            sections = {
-                'headline': data['headline'],
-                'summary': data['summary'],
-                'experience': data['experience'],
-                'skills': data['skills'],
-                'education': data['education']
+            logger.error("Error in analyze_profile_stream: %s", e)
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def run_analysis(data, progress=None):
+    """Run the full analysis pipeline for one profile and return the result dict.
+
+    ``progress(stage, status)`` is called as each model stage finishes. When
+    ``data`` carries the ``analysis_id`` of an earlier analysis, only the
+    stages whose inputs changed are run again; see incremental.py.
+    """
+    combined_text = combine_profile_text(data)
+    sections = profile_sections(data)
+    analysis = incremental.start(data)
+    stale = [stage for stage in MODEL_STAGES if analysis.stale(stage)]
+    
+    # The upstream calls are independent of each other, so send them all at
+    # once and wait for the slowest one instead of paying for each in turn
+    deadline = new_deadline()
+    started = time.perf_counter()
+    futures, keyword_models = start_model_calls(combined_text, sections, deadline, stale)
+    if progress is not None:
+        report_stages(futures, progress)
+    # Keyword batches run outside this request's context, so time them from here
+    keyword_futures = [future for key, future in futures.items() if stage_of(key) == 'keywords']
+    if keyword_futures:
+        wait(keyword_futures, timeout=max(0, deadline - time.monotonic()))
+        metrics.record_span(time.perf_counter() - started, 'keywords_wait')
+    results = gather(futures, deadline)
+    for stage in stale:
+        record_model_stage(analysis, stage, results, combined_text, sections, keyword_models)
+    
+    keywords = merge_keywords(analysis.output(stage) for stage in KEYWORD_STAGES)
+    findings, score = settle_rules(analysis, data, keywords)
+    
+    if progress is not None:
+        progress('rules', 'done')
+    
+    return store_analysis(analysis, {
+        'score': score,
+        'summary': analysis.output('summary'),
+        'keywords': keywords,
+        'strengths': findings['strengths'],
+        'improvements': findings['improvements'],
+        'suggestions': findings['suggestions']
+    })
+
+def run_batch_analysis(data, progress=None):
+    """``run_analysis`` for background and bulk work, whose upstream calls yield to interactive ones"""
+    with rate_limiter.priority(batch=True):
+        return run_analysis(data, progress)
+
+def stream_analysis(data):
+    """Run the analysis pipeline for one profile, yielding (event, payload) as parts finish.
+
+    The rule-based results come first, worked out with a neutral sentiment
+    and no keywords unless an earlier analysis already has them.
+    ``keywords``, ``sentiment`` and ``summary`` follow in whichever order
+    their models answer, with the rule results they change, and ``done``
+    carries the same result as ``run_analysis``.
+    """
+    combined_text = combine_profile_text(data)
+    sections = profile_sections(data)
+    analysis = incremental.start(data)
+    stale = [stage for stage in MODEL_STAGES if analysis.stale(stage)]
+    
+    deadline = new_deadline()
+    started = time.perf_counter()
+    futures, keyword_models = start_model_calls(combined_text, sections, deadline, stale)
+    scan = scan_rules(data)
+    
+    # Events and the stages that still have to finish before each can be sent
+    events = {'keywords': [stage for stage in stale if stage in KEYWORD_STAGES]}
+    for stage in ('sentiment', 'summary'):
+        events[stage] = [stage] if stage in stale else []
+    
+    sentiment_score = NEUTRAL_SENTIMENT if events['sentiment'] else analysis.output('sentiment')
+    keywords = [] if events['keywords'] else merge_keywords(analysis.output(stage) for stage in KEYWORD_STAGES)
+    yield 'rules', apply_rules(data, scan, sentiment_score, keywords)
+    
+    if BACKEND_MODE == 'local_first':
+        # Local results go out straight away and are replaced as the remote ones arrive
+        if events['keywords']:
+            keywords = merge_keywords(
+                keyword_words(local_backend.run_task('keywords', sections[stage.split(':', 1)[1]]))
+                if stage in events['keywords'] else analysis.output(stage)
+                for stage in KEYWORD_STAGES
+            )
+            rule_results = apply_rules(data, scan, sentiment_score, keywords)
+            yield 'keywords', {'keywords': keywords, 'suggestions': rule_results['suggestions'], 'preliminary': True}
+        if events['sentiment']:
+            sentiment_score = star_rating(local_backend.run_task('sentiment', combined_text))
+            rule_results = apply_rules(data, scan, sentiment_score, keywords)
+            yield 'sentiment', {
+                'sentiment': sentiment_score,
+                'score': rule_results['score'],
+                'strengths': rule_results['strengths'],
+                'improvements': rule_results['improvements'],
+                'preliminary': True
             }
+        if events['summary']:
+            summary = local_backend.run_task('summarization', combined_text)[0]['summary_text']
+            yield 'summary', {'summary': summary, 'preliminary': True}
+    
+    while events:
+        # Only calls still running; waiting on finished ones would return at once
+        pending = [
+            futures[key]
+            for stages in events.values() for stage in stages
+            for key in stage_keys(stage, keyword_models)
+            if not futures[key].done()
+        ]
+        if pending:
+            wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        out_of_time = time.monotonic() >= deadline
+        
+        for event in list(events):
+            keys = [key for stage in events[event] for key in stage_keys(stage, keyword_models)]
+            if not out_of_time and not all(futures[key].done() for key in keys):
+                continue
+            results = gather({key: futures[key] for key in keys}, deadline)
+            if event == 'keywords' and keys:
+                metrics.record_span(time.perf_counter() - started, 'keywords_wait')
+            for stage in events.pop(event):
+                record_model_stage(analysis, stage, results, combined_text, sections, keyword_models)
             
-            for section_name, section_text in sections.items():
-                for model in models:
-                    try:
-                        response = analyze_text(section_text, model)
-                        if isinstance(response, list) and len(response) > 0:
-                            if isinstance(response[0], dict) and 'word' in response[0]:
-                                keywords.update(k['word'] for k in response[0])
-                            elif isinstance(response[0], str):
-                                keywords.add(response[0])
-                    except Exception as e:
-                        logger.error(f"Keyword extraction failed for model {model} in section {section_name}: {str(e)}")
-                        continue
-            
-            # Add some common professional keywords if none were found
-            if not keywords:
-                common_keywords = {
-                    "leadership", "management", "project", "team", "communication",
-                    "technical", "development", "analytics", "strategy", "innovation",
-                    "problem-solving", "collaboration", "planning", "execution"
+            if event == 'summary':
+                yield 'summary', {'summary': analysis.output('summary')}
+            elif event == 'keywords':
+                keywords = merge_keywords(analysis.output(stage) for stage in KEYWORD_STAGES)
+                rule_results = apply_rules(data, scan, sentiment_score, keywords)
+                yield 'keywords', {'keywords': keywords, 'suggestions': rule_results['suggestions']}
+            elif event == 'sentiment':
+                sentiment_score = analysis.output('sentiment')
+                rule_results = apply_rules(data, scan, sentiment_score, keywords)
+                yield 'sentiment', {
+                    'sentiment': sentiment_score,
+                    'score': rule_results['score'],
+                    'strengths': rule_results['strengths'],
+                    'improvements': rule_results['improvements']
                 }
-                keywords.update(common_keywords)
-            
-            keywords = list(keywords)
-        except Exception as e:
-            logger.error(f"All keyword extraction attempts failed: {str(e)}")
-            keywords = ["leadership", "management", "project", "team", "communication"]
-        
-        # Sentiment analysis
+    
+    findings, score = settle_rules(analysis, data, keywords, scan)
+    yield 'done', store_analysis(analysis, {
+        'score': score,
+        'summary': analysis.output('summary'),
+        'keywords': keywords,
+        'strengths': findings['strengths'],
+        'improvements': findings['improvements'],
+        'suggestions': findings['suggestions']
+    })
+
+def store_analysis(analysis, result):
+    """Save a finished analysis, adding its id and the stages that ran to the result"""
+    result['analysis_id'] = analysis_store.save(result, analysis.snapshot())
+    result['recomputed'] = analysis.recomputed
+    return result
+
+def combine_profile_text(data):
+    # Combine all text fields for analysis with better formatting
+    return f"""
+    Headline: {data['headline']}
+    Summary: {data['summary']}
+    Experience: {data['experience']}
+    Skills: {data['skills']}
+    Education: {data['education']}
+    """
+
+def profile_sections(data):
+    # Extract keywords from each section separately
+    return {
+        'headline': data['headline'],
+        'summary': data['summary'],
+        'experience': data['experience'],
+        'skills': data['skills'],
+        'education': data['education']
+    }
+
+def start_model_calls(combined_text, sections, deadline, stages=MODEL_STAGES):
+    """Send the model calls for the given stages, returning (futures by call, keyword model names)"""
+    futures = {}
+    for task in ('summary', 'sentiment'):
+        if task not in stages:
+            continue
+        available = model_registry.models_for(TASK_MODELS[task], limit=1)
+        if available:
+            futures[task] = submit_chunked(task, combined_text, available[0], deadline)
+        else:
+            futures[task] = failed_future(RuntimeError(f"No {TASK_MODELS[task]} model available"))
+    
+    # Each keyword model sees every changed section in one batched request
+    keyword_sections = [name for name in sections if f"keywords:{name}" in stages]
+    if not keyword_sections:
+        return futures, []
+    available = model_registry.models_for('keywords')
+    # Short of upstream quota, every keyword model but the cheapest is dropped
+    if len(available) > 1 and rate_limiter.under_pressure():
+        rate_limiter.shed(len(available) - 1)
+        available = [model_registry.cheapest(available)]
+    keyword_models = [model.name for model in available]
+    for model in available:
+        budget = text_chunking.input_tokens(model)
+        section_chunks = {name: text_chunking.chunk_text(sections[name], budget) for name in keyword_sections}
+        chunk_texts = [chunk for name in keyword_sections for chunk in section_chunks[name]]
+        chunk_futures = iter(submit_keywords(model, chunk_texts, deadline))
+        for section_name in keyword_sections:
+            parts = [next(chunk_futures) for _ in section_chunks[section_name]]
+            futures[('keywords', section_name, model.name)] = (
+                parts[0] if len(parts) == 1 else combine(parts, text_chunking.merge_keywords)
+            )
+    return futures, keyword_models
+
+def submit_chunked(task, text, model, deadline):
+    """Run a summary or sentiment model over each chunk of the text in parallel, merging the results.
+
+    Text within the model's input window takes one call. A longer summary
+    takes one more: the chunk summaries are joined and summarized once.
+    """
+    chunks = text_chunking.chunk_text(text, text_chunking.input_tokens(model))
+    parts = [submit(analyze_text, chunk, model.name, model.task_type, deadline=deadline) for chunk in chunks]
+    if len(parts) == 1:
+        return parts[0]
+    if task == 'sentiment':
+        return combine(parts, lambda responses: text_chunking.merge_sentiment(responses, chunks))
+    
+    def summarize_summaries(responses):
+        joined = ' '.join(text_chunking.summaries(responses))
+        return submit(analyze_text, joined, model.name, model.task_type, deadline=deadline)
+    return combine(parts, summarize_summaries)
+
+def stage_keys(stage, keyword_models):
+    """Keys of the model calls behind one incremental analysis stage"""
+    if stage in KEYWORD_STAGES:
+        section_name = stage.split(':', 1)[1]
+        return [('keywords', section_name, model) for model in keyword_models]
+    return [stage]
+
+def record_model_stage(analysis, stage, results, combined_text, sections, keyword_models):
+    """Parse a model stage's results into the analysis; failed calls are not reused later"""
+    keys = stage_keys(stage, keyword_models)
+    succeeded = bool(keys) and all(results[key].exception() is None for key in keys)
+    if stage == 'summary':
+        analysis.record(stage, summary_from(results, combined_text), succeeded)
+    elif stage == 'sentiment':
+        analysis.record(stage, sentiment_from(results, combined_text), succeeded)
+    else:
+        section_name = stage.split(':', 1)[1]
+        words = section_keywords(results, section_name, sections[section_name], keyword_models)
+        # Keywords from fewer models than usual, shed or skipped by a breaker, are redone next time
+        complete = set(keyword_models) == {model.name for model in model_registry.enabled_models('keywords')}
+        analysis.record(stage, words, succeeded and complete)
+
+def settle_rules(analysis, data, keywords, scan=None):
+    """Rule findings and score, recomputed only when their inputs changed"""
+    if analysis.stale('rules'):
+        scan = scan or scan_rules(data)
+        sentiment_score = analysis.output('sentiment')
+        analysis.record('rules', find_rules(data, scan, sentiment_score, keywords))
+    findings = analysis.output('rules')
+    if analysis.stale('score'):
+        analysis.record('score', score_profile(data, findings))
+    return findings, analysis.output('score')
+
+def summary_from(results, combined_text):
+    # Text summarization
+    try:
+        summary_response = model_result(results, 'summary', 'summarization', combined_text)
+        summary = summary_response[0]['summary_text']
+    except Exception as e:
+        logger.error("Summarization failed: %s", e)
+        summary = "Unable to generate summary"
+    return summary
+
+def section_keywords(results, section_name, section_text, keyword_models):
+    """Keywords every keyword model found in one section"""
+    keywords = set()
+    # In local_first mode a section still gets local keywords when every model was skipped
+    section_models = keyword_models or ([None] if BACKEND_MODE == 'local_first' else [])
+    for model in section_models:
         try:
-            sentiment_response = analyze_text(combined_text, "nlptown/bert-base-multilingual-uncased-sentiment")
-            sentiment_score = float(sentiment_response[0]['label'].split()[0])
+            response = model_result(results, ('keywords', section_name, model), 'keywords', section_text)
+            keywords.update(keyword_words(response))
         except Exception as e:
-            logger.error(f"Sentiment analysis failed: {str(e)}")
-            sentiment_score = 3.0  # Neutral sentiment as fallback
+            logger.error("Keyword extraction failed for model %s in section %s: %s", model, section_name, e)
+            continue
+    return sorted(keywords)
+
+def keyword_words(response):
+    """Words of a keyword model's response"""
+    if isinstance(response, list) and len(response) > 0:
+        if isinstance(response[0], dict) and 'word' in response[0]:
+            return [k['word'] for k in response if 'word' in k]
+        elif isinstance(response[0], str):
+            return [response[0]]
+    return []
+
+def merge_keywords(section_keywords):
+    # Keyword extraction with multiple models
+    keywords = set()
+    try:
+        for words in section_keywords:
+            keywords.update(words)
+        
+        # Add some common professional keywords if none were found
+        if not keywords:
+            common_keywords = {
+                "leadership", "management", "project", "team", "communication",
+                "technical", "development", "analytics", "strategy", "innovation",
+                "problem-solving", "collaboration", "planning", "execution"
+            }
+            keywords.update(common_keywords)
         
+        keywords = list(keywords)
+    except Exception as e:
+        logger.error("All keyword extraction attempts failed: %s", e)
+        keywords = ["leadership", "management", "project", "team", "communication"]
+    return keywords
+
+def sentiment_from(results, combined_text):
+    # Sentiment analysis
+    try:
+        sentiment_response = model_result(results, 'sentiment', 'sentiment', combined_text)
+        sentiment_score = star_rating(sentiment_response)
+    except Exception as e:
+        logger.error("Sentiment analysis failed: %s", e)
+        sentiment_score = NEUTRAL_SENTIMENT  # Neutral sentiment as fallback
+    return sentiment_score
+
+def star_rating(response):
+    """Star rating of a sentiment model's response"""
+    return float(text_chunking.top_label(response)['label'].split()[0])
+
+def scan_rules(data):
+    # Scan the profile for rule terms once for strengths, improvements and suggestions
+    try:
+        with metrics.span('scan'):
+            scan = scan_profile(data)
+    except Exception as e:
+        logger.error("Error scanning profile: %s", e)
+        scan = None
+    return scan
+
+def find_rules(data, scan, sentiment_score, keywords):
+    """Strengths, improvements and suggestions from the keyword rules"""
+    with metrics.span('rules'):
         # Generate strengths and improvements first
-        strengths, improvements = analyze_strengths_and_improvements(data, sentiment_score)
-        
-        # Prepare analysis results for score calculation
-        analysis_results = {
-            **data,  # Include all profile data
-            'strengths': strengths,
-            'improvements': improvements
-        }
-        
-        # Calculate profile score
-        score = calculate_profile_score(analysis_results)
+        strengths, improvements = analyze_strengths_and_improvements(data, sentiment_score, scan)
         
         # Generate detailed suggestions
-        suggestions = generate_suggestions(data, keywords)
-        
-        return jsonify({
-            'score': score,
-            'summary': summary,
-            'keywords': keywords,
-            'strengths': strengths,
-            'improvements': improvements,
-            'suggestions': suggestions
-        })
-        
-    except Exception as e:
-        logger.error(f"Error in analyze_profile: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+        suggestions = generate_suggestions(data, keywords, scan)
+    
+    return {
+        'strengths': strengths,
+        'improvements': improvements,
+        'suggestions': suggestions
+    }
+
+def score_profile(data, findings):
+    # Prepare analysis results for score calculation
+    analysis_results = {
+        **data,  # Include all profile data
+        'strengths': findings['strengths'],
+        'improvements': findings['improvements']
+    }
+    
+    # Calculate profile score
+    with metrics.span('score'):
+        return calculate_profile_score(analysis_results)
+
+def apply_rules(data, scan, sentiment_score, keywords):
+    """Rule-based results: strengths, improvements, the score and suggestions"""
+    findings = find_rules(data, scan, sentiment_score, keywords)
+    return {'score': score_profile(data, findings), **findings}
 
 def calculate_profile_score(analysis_results):
     """Calculate a profile score based on analysis results"""
     try:
         # Initialize base score
         score = 0
-        max_score = 100
+        max_score = MAX_SCORE
         
-        # Define minimum content requirements for each section
-        min_requirements = {
-            'headline': {'length': 10, 'points': 20},
-            'summary': {'length': 200, 'points': 25},
-            'experience': {'length': 100, 'points': 25},
-            'skills': {'length': 50, 'points': 20},
-            'education': {'length': 50, 'points': 10}
-        }
+        # Minimum content requirements for each section, shared with batch_scoring.py
+        min_requirements = SCORE_REQUIREMENTS
         
         # Check each section's content quality
         for section, requirements in min_requirements.items():
@@ -181,11 +606,11 @@ def calculate_profile_score(analysis_results):
         improvements = analysis_results.get('improvements', [])
         
         # Add points for strengths (up to 10 points)
-        strength_points = min(len(strengths) * 2, 10)
+        strength_points = min(len(strengths) * FINDING_POINTS, MAX_FINDING_POINTS)
         score += strength_points
         
         # Deduct points for improvements (up to 10 points)
-        improvement_points = min(len(improvements) * 2, 10)
+        improvement_points = min(len(improvements) * FINDING_POINTS, MAX_FINDING_POINTS)
         score -= improvement_points
         
         # Ensure score stays within 0-100 range
@@ -194,340 +619,203 @@ def calculate_profile_score(analysis_results):
         # Round to nearest integer
         score = round(score)
         
-        logging.info(f"Calculated profile score: {score}")
+        logger.debug("Calculated profile score: %s", score)
         return score
         
     except Exception as e:
-        logging.error(f"Error calculating profile score: {str(e)}")
+        logger.error("Error calculating profile score: %s", e)
         return 0
 
-def generate_suggestions(profile, keywords):
+def generate_suggestions(profile, keywords, scan=None):
     try:
-        suggestions = []
-        text = profile['summary'].lower()
-        
-        # Content suggestions
-        if len(profile['summary']) < 200:
-            suggestions.append("Expand your professional summary to be more comprehensive")
-        if len(keywords) < 5:
-            suggestions.append("Include more industry-specific keywords in your profile")
-        if "achievement" not in text and "result" not in text:
-            suggestions.append("Add more quantifiable achievements to your experience")
-        
-        # Formatting suggestions
-        if len(profile['headline']) < 10:
-            suggestions.append("Make your headline more descriptive and impactful")
-        if len(profile['experience']) < 100:
-            suggestions.append("Add more detail to your work experience section")
-        if len(profile['skills']) < 50:
-            suggestions.append("Expand your skills section with more specific competencies")
-        
-        # Content quality suggestions
-        if "data" in text and "analytics" not in text:
-            suggestions.append("Consider adding data analytics experience if relevant")
-        if "cloud" in text and "aws" not in text and "azure" not in text:
-            suggestions.append("Specify cloud platforms you're familiar with")
-        if "agile" in text and "scrum" not in text:
-            suggestions.append("Mention specific agile methodologies you've used")
-        
-        # Industry-specific suggestions
-        if "tech" in text or "software" in text:
-            suggestions.append("Include specific programming languages and frameworks")
-        if "market" in text or "sales" in text:
-            suggestions.append("Add metrics about sales performance or market impact")
-        if "finance" in text or "account" in text:
-            suggestions.append("Mention financial software or tools you're familiar with")
-        
-        # Professional development suggestions
-        if "certification" not in text:
-            suggestions.append("Consider adding relevant professional certifications")
-        if "education" not in text or len(profile['education']) < 50:
-            suggestions.append("Expand your education section with relevant details")
-        
-        return suggestions
+        # Rules only look at the summary's terms, see rules.SUGGESTION_RULES
+        scan = scan or scan_profile(profile)
+        return SUGGESTIONS.apply(profile, scan, keywords=keywords)
     except Exception as e:
-        logger.error(f"Error in generate_suggestions: {str(e)}")
+        logger.error("Error in generate_suggestions: %s", e)
         return ["Unable to generate suggestions"]
 
-def analyze_strengths_and_improvements(profile, sentiment_score):
+def analyze_strengths_and_improvements(profile, sentiment_score, scan=None):
     try:
-        strengths = []
-        improvements = []
-        
-        # Combine all text sections for analysis
-        text = f"{profile['headline']} {profile['summary']} {profile['experience']} {profile['skills']} {profile['education']}".lower()
-        
-        # Professional strengths
-        if "leadership" in text or "manage" in text or "direct" in text:
-            strengths.append("Strong leadership and management experience")
-        if "project" in text or "program" in text:
-            strengths.append("Project and program management expertise")
-        if "technical" in text or "develop" in text or "engineer" in text:
-            strengths.append("Technical proficiency and development skills")
-        if "innov" in text or "creativ" in text:
-            strengths.append("Innovative and creative problem-solving abilities")
-        if "communicat" in text or "present" in text:
-            strengths.append("Strong communication and presentation skills")
-        if "team" in text or "collaborat" in text:
-            strengths.append("Team collaboration and interpersonal skills")
-        if "analyt" in text or "research" in text:
-            strengths.append("Analytical and research capabilities")
-        if "strateg" in text or "plan" in text:
-            strengths.append("Strategic planning and execution")
-        
-        # Education-based strengths
-        if "degree" in text or "bachelor" in text or "master" in text or "phd" in text:
-            strengths.append("Strong educational background")
-        if "certification" in text or "certified" in text:
-            strengths.append("Professional certifications and qualifications")
-        
-        # Experience-based strengths
-        if "experience" in text and len(profile['experience']) > 100:
-            strengths.append("Comprehensive work experience")
-        if "achievement" in text or "result" in text:
-            strengths.append("Track record of achievements and results")
-        
-        # Identify areas for improvement
-        if "certification" not in text and "certified" not in text:
-            improvements.append("Consider adding relevant professional certifications")
-        if "volunteer" not in text and "community" not in text:
-            improvements.append("Include volunteer work or community involvement")
-        if "mentor" not in text and "teach" not in text:
-            improvements.append("Add mentoring or teaching experience")
-        if "achievement" not in text and "result" not in text:
-            improvements.append("Include more quantifiable achievements and results")
-        if "skill" not in text and "expertise" not in text:
-            improvements.append("Add more specific skills and areas of expertise")
-        if "network" not in text and "connect" not in text:
-            improvements.append("Highlight your professional network and connections")
-        if "goal" not in text and "objective" not in text:
-            improvements.append("Add your career goals and objectives")
-        
-        # Section-specific improvements
-        if len(profile['headline']) < 10:
-            improvements.append("Make your headline more descriptive and impactful")
-        if len(profile['experience']) < 100:
-            improvements.append("Add more detail to your work experience section")
-        if len(profile['skills']) < 50:
-            improvements.append("Expand your skills section with more specific competencies")
-        if len(profile['education']) < 50:
-            improvements.append("Expand your education section with more relevant details")
-        
-        # Add sentiment-based suggestions
-        if sentiment_score < 3:
-            improvements.append("Consider using more positive and confident language")
-        elif sentiment_score > 4:
-            strengths.append("Strong positive and confident tone")
-        
+        # One pass over all text sections, shared with generate_suggestions when passed in
+        scan = scan or scan_profile(profile)
+        strengths = STRENGTHS.apply(profile, scan, sentiment_score)
+        improvements = IMPROVEMENTS.apply(profile, scan, sentiment_score)
         return strengths, improvements
     except Exception as e:
-        logger.error(f"Error in analyze_strengths_and_improvements: {str(e)}")
+        logger.error("Error in analyze_strengths_and_improvements: %s", e)
         return [], []
 
 def analyze_text(text, model_name, task_type="text-generation"):
-    """Analyze text using HuggingFace API with better error handling"""
-    if not HUGGINGFACE_API_KEY:
-        logger.error("HuggingFace API key not found in environment variables")
-        raise ValueError("HuggingFace API key not configured")
-    
-    # Truncate text to a reasonable length (1024 characters)
-    truncated_text = text[:1024] if len(text) > 1024 else text
-    logger.debug(f"Truncated text length: {len(truncated_text)}")
-    
-    headers = {
-        "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
-        "Content-Type": "application/json"
-    }
+    """Analyze text with the configured inference backend"""
+    with metrics.span('analyze_text', model_name):
+        return backend.analyze(text, model_name, task_type)
+
+def submit_keywords(model, texts, deadline):
+    """One future per text for a keyword model, batched with other requests' texts where that helps"""
+    if backend.batches:
+        return get_keyword_batcher(model.name).submit(texts, deadline=deadline)
+    # Without batching, waiting for other requests' inputs only adds latency; the
+    # local models take well under a millisecond per text, so run them right here
+    futures = []
+    for text in texts:
+        future = Future()
+        try:
+            future.set_result(analyze_text(text, model.name, model.task_type))
+        except Exception as e:
+            future.set_exception(e)
+        futures.append(future)
+    return futures
+
+def get_keyword_batcher(model_name):
+    """Shared micro-batcher that merges keyword inputs across requests"""
+    spec = model_registry.get_model(model_name)
+    task_type = spec.task_type if spec is not None else "text-generation"
+    primary = model_registry.primary_model('keywords')
+    # Keywords from the other models only add to the cheapest one's, so their calls are optional
+    optional = primary is not None and primary.name != model_name
+    def send(texts):
+        with metrics.span('analyze_batch', model_name), rate_limiter.priority(optional=optional):
+            return backend.analyze_many(texts, model_name, task_type)
+    return get_batcher(model_name, send)
+
+def stage_of(key):
+    """Analysis stage a model call belongs to, e.g. 'keywords' for every keyword call"""
+    return key[0] if isinstance(key, tuple) else key
+
+def report_stages(futures, progress):
+    """Call progress(stage, status) once every model call of a stage has finished"""
+    stages = {}
+    for key, future in futures.items():
+        stages.setdefault(stage_of(key), []).append(future)
     
+    lock = threading.Lock()
+    for stage, stage_futures in stages.items():
+        progress(stage, 'running')
+        state = {'remaining': len(stage_futures), 'failed': False}
+        
+        def finished(future, stage=stage, state=state):
+            with lock:
+                state['failed'] = state['failed'] or future.cancelled() or future.exception() is not None
+                state['remaining'] -= 1
+                if state['remaining']:
+                    return
+            progress(stage, 'failed' if state['failed'] else 'done')
+        
+        for future in stage_futures:
+            future.add_done_callback(finished)
+
+def model_result(results, key, task, text):
+    """Result of a model call, using the local backend for failures in local_first mode"""
     try:
-        logger.debug(f"Sending request to {model_name}")
-        payload = {
-            "inputs": truncated_text,
-            "parameters": {
-                "max_length": 1024,
-                "truncation": True
-            }
-        }
-        
-        # Add task-specific parameters
-        if task_type == "text-generation":
-            payload["parameters"].update({
-                "max_length": 200,
-                "num_return_sequences": 3,
-                "temperature": 0.7
-            })
-        
-        response = requests.post(
-            f"{API_URL}/{model_name}",
-            headers=headers,
-            json=payload
-        )
-        
-        logger.debug(f"Response status: {response.status_code}")
-        
-        if response.status_code == 401:
-            logger.error("Authentication failed with HuggingFace API")
-            logger.error(f"Response content: {response.text}")
-            raise ValueError("Invalid HuggingFace API key")
-        elif response.status_code != 200:
-            logger.error(f"API request failed with status {response.status_code}")
-            logger.error(f"Response content: {response.text}")
-            raise ValueError(f"API request failed: {response.text}")
-            
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request failed: {str(e)}")
-        raise
-
-def generate_pdf_report(analysis_data):
-    """Generate a beautiful PDF report from the analysis data"""
-    # Create a buffer to store the PDF
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        textColor=colors.HexColor('#0077B5')  # LinkedIn blue
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=12,
-        textColor=colors.HexColor('#0077B5')
-    )
-    
-    # Title
-    elements.append(Paragraph("LinkedIn Profile Analysis Report", title_style))
-    elements.append(Spacer(1, 20))
-    
-    # Date
-    date_style = ParagraphStyle(
-        'Date',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=colors.gray
-    )
-    elements.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y %H:%M')}", date_style))
-    elements.append(Spacer(1, 30))
-    
-    # Profile Score
-    score_style = ParagraphStyle(
-        'Score',
-        parent=styles['Heading2'],
-        fontSize=36,
-        textColor=colors.HexColor('#0077B5'),
-        alignment=1  # Center alignment
-    )
-    elements.append(Paragraph(f"Profile Score: {analysis_data['score']}%", score_style))
-    elements.append(Spacer(1, 30))
-    
-    # Key Strengths
-    elements.append(Paragraph("Key Strengths", heading_style))
-    strengths_data = [[Paragraph(strength, styles['Normal'])] for strength in analysis_data['strengths']]
-    strengths_table = Table(strengths_data, colWidths=[6*inch])
-    strengths_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#E1F0FA')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#0077B5')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('TOPPADDING', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#0077B5')),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    elements.append(strengths_table)
-    elements.append(Spacer(1, 20))
-    
-    # Areas for Improvement
-    elements.append(Paragraph("Areas for Improvement", heading_style))
-    improvements_data = [[Paragraph(improvement, styles['Normal'])] for improvement in analysis_data['improvements']]
-    improvements_table = Table(improvements_data, colWidths=[6*inch])
-    improvements_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#FFF5F5')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#DC3545')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('TOPPADDING', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#DC3545')),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    elements.append(improvements_table)
-    elements.append(Spacer(1, 20))
-    
-    # Suggested Keywords
-    elements.append(Paragraph("Suggested Keywords", heading_style))
-    keywords_data = [[Paragraph(keyword, styles['Normal'])] for keyword in analysis_data['keywords']]
-    keywords_table = Table(keywords_data, colWidths=[6*inch])
-    keywords_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#F8F9FA')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#212529')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('TOPPADDING', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#DEE2E6')),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    elements.append(keywords_table)
-    elements.append(Spacer(1, 20))
-    
-    # Detailed Suggestions
-    elements.append(Paragraph("Detailed Suggestions", heading_style))
-    suggestions_data = [[Paragraph(suggestion, styles['Normal'])] for suggestion in analysis_data['suggestions']]
-    suggestions_table = Table(suggestions_data, colWidths=[6*inch])
-    suggestions_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#F8F9FA')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#212529')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('TOPPADDING', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#DEE2E6')),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    elements.append(suggestions_table)
-    
-    # Build the PDF
-    doc.build(elements)
-    
-    # Get the value of the BytesIO buffer and write it to the response
-    buffer.seek(0)
-    return buffer
+        return results[key].result()
+    except Exception as e:
+        if BACKEND_MODE != 'local_first':
+            raise
+        logger.warning("Using local %s result for %s: %s", task, key, e)
+        return local_backend.run_task(task, text)
+
+@app.route('/analysis/<analysis_id>')
+def get_analysis(analysis_id):
+    result = analysis_store.get(analysis_id)
+    if result is None:
+        return jsonify({'error': 'Unknown or expired analysis'}), 404
+    return jsonify({**result, 'analysis_id': analysis_id})
+
+@app.route('/generate-pdf/<analysis_id>')
+def generate_stored_pdf(analysis_id):
+    """PDF report of a stored analysis, so the client only sends its id"""
+    result = analysis_store.get(analysis_id)
+    if result is None:
+        return jsonify({'error': 'Unknown or expired analysis'}), 404
+    return send_pdf(result)
 
 @app.route('/generate-pdf', methods=['POST'])
 def generate_pdf():
+    return send_pdf(request.get_json())
+
+def send_pdf(analysis_data):
+    """Response with the rendered PDF report of an analysis"""
     try:
-        data = request.get_json()
-        pdf_buffer = generate_pdf_report(data)
+        with metrics.span('pdf'):
+            pdf = pdf_report.render(analysis_data)
         
         # Generate a filename with timestamp
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f'linkedin_profile_analysis_{timestamp}.pdf'
         
         return send_file(
-            pdf_buffer,
+            io.BytesIO(pdf),
             mimetype='application/pdf',
             as_attachment=True,
             download_name=filename
         )
+    except pdf_report.RenderQueueFull as e:
+        logger.warning("Rejecting PDF request: %s", e)
+        response = jsonify({'error': 'Too many reports are being generated, try again later'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
     except Exception as e:
-        logger.error(f"Error generating PDF: {str(e)}")
+        logger.error("Error generating PDF: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/generate-pdf/bulk', methods=['POST'])
+def generate_pdf_bulk():
+    """Export analyses or stored analysis ids as a streamed ZIP of reports, or with ?format=pdf as one document"""
+    analyses = request.get_json()
+    if not isinstance(analyses, list):
+        return jsonify({'error': 'Expected a list of analyses'}), 400
+    if len(analyses) > pdf_report.PDF_BULK_MAX_REPORTS:
+        return jsonify({'error': f"At most {pdf_report.PDF_BULK_MAX_REPORTS} reports per export"}), 413
+    
+    # Stored analyses can be given by id instead of in full
+    unknown = []
+    for index, analysis in enumerate(analyses):
+        if isinstance(analysis, str):
+            stored = analysis_store.get(analysis)
+            if stored is None:
+                unknown.append(analysis)
+            else:
+                analyses[index] = {**stored, 'id': analysis}
+    if unknown:
+        return jsonify({'error': 'Unknown or expired analyses', 'unknown': unknown}), 404
+    if not all(isinstance(analysis, dict) for analysis in analyses):
+        return jsonify({'error': 'Expected a list of analyses or analysis ids'}), 400
+    invalid = {index: pdf_report.missing_fields(analysis) for index, analysis in enumerate(analyses)}
+    invalid = {index: fields for index, fields in invalid.items() if fields}
+    if invalid:
+        return jsonify({'error': 'Some analyses are missing fields', 'missing': invalid}), 400
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    export_format = request.args.get('format', 'zip')
+    if export_format == 'zip':
+        # Reports are added to the archive and sent as each one finishes rendering
+        response = Response(stream_with_context(pdf_report.stream_zip(analyses)), mimetype='application/zip')
+        response.headers['Content-Disposition'] = f'attachment; filename=linkedin_profile_analyses_{timestamp}.zip'
+        return response
+    elif export_format == 'pdf':
+        try:
+            path = pdf_report.render_combined(analyses)
+        except pdf_report.RenderQueueFull as e:
+            logger.warning("Rejecting bulk PDF request: %s", e)
+            return jsonify({'error': 'Too many reports are being generated, try again later'}), 503
+        except Exception as e:
+            logger.error("Error generating combined PDF: %s", e)
+            return jsonify({'error': str(e)}), 500
+        
+        # Stream the file from disk; it is gone from the filesystem once closed
+        report = open(path, 'rb')
+        os.remove(path)
+        return send_file(
+            report,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f'linkedin_profile_analyses_{timestamp}.pdf'
+        )
+    return jsonify({'error': 'format must be zip or pdf'}), 400
+
 if __name__ == '__main__':
+    # Pick up jobs left queued by an earlier run; with the reloader only the serving child does
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        job_queue.start()
     app.run(debug=True) 
\ No newline at end of file
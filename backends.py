@@ -0,0 +1,195 @@
+import os
+import logging
+import requests
+
+import local_nlp
+import text_chunking
+import metrics
+import inference_cache
+import model_registry
+from inference_client import post_inference
+
+logger = logging.getLogger(__name__)
+
+# Which backend runs the models: "remote" (HuggingFace API), "local" (in-process,
+# no network) or "local_first" (local results first in streamed analyses, then
+# refined by the remote ones, with local ones kept for anything the remote API
+# could not deliver)
+BACKEND_MODE = os.getenv('INFERENCE_BACKEND', 'remote')
+BACKEND_MODES = ('remote', 'local', 'local_first')
+
+
+def build_parameters(task_type):
+    """Request parameters sent with every input for a task type"""
+    parameters = {
+        "max_length": 1024,
+        "truncation": True
+    }
+
+    # Add task-specific parameters
+    if task_type == "text-generation":
+        parameters.update({
+            "max_length": 200,
+            "num_return_sequences": 3,
+            "temperature": 0.7
+        })
+
+    return parameters
+
+
+def truncate_text(text, model_name):
+    # Truncate text to the model's input window
+    max_chars = text_chunking.window_chars(model_registry.get_model(model_name))
+    return text[:max_chars] if len(text) > max_chars else text
+
+
+def model_parameters(model_name, task_type):
+    """Request parameters for a model, including its registry overrides"""
+    parameters = build_parameters(task_type)
+    spec = model_registry.get_model(model_name)
+    if spec is not None:
+        parameters.update(spec.parameters)
+    return parameters
+
+
+class InferenceBackend:
+    """Runs a registry model over text and returns HuggingFace-shaped results"""
+
+    name = None
+    # Whether analyze_many sends several inputs in one call, so that gathering them pays off
+    batches = False
+
+    def analyze(self, text, model_name, task_type="text-generation"):
+        raise NotImplementedError
+
+    def analyze_many(self, texts, model_name, task_type="text-generation"):
+        """One result per text; backends that can batch override this"""
+        return [self.analyze(text, model_name, task_type) for text in texts]
+
+
+class RemoteBackend(InferenceBackend):
+    """HuggingFace Inference API with result caching"""
+
+    name = 'remote'
+    batches = True
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def analyze(self, text, model_name, task_type="text-generation"):
+        truncated_text = truncate_text(text, model_name)
+        logger.debug("Truncated text length: %s", len(truncated_text))
+        parameters = model_parameters(model_name, task_type)
+
+        # Identical inputs to the same model give the same answer, so reuse it
+        key = inference_cache.cache_key(model_name, truncated_text, parameters)
+        cached = inference_cache.lookup(key)
+        if cached is not None:
+            logger.debug("Cache hit for %s", model_name)
+            return cached
+
+        result = self._post(model_name, {"inputs": truncated_text, "parameters": parameters})
+        inference_cache.store(key, model_name, result)
+        return result
+
+    def analyze_many(self, texts, model_name, task_type="text-generation"):
+        """Analyze several texts with one model in a single HuggingFace request.
+
+        Only meant for models whose single-input response is the per-input
+        result of a batched request, such as the token classification models
+        used for keyword extraction.
+        """
+        parameters = model_parameters(model_name, task_type)
+        truncated = [truncate_text(text, model_name) for text in texts]
+        keys = [inference_cache.cache_key(model_name, text, parameters) for text in truncated]
+
+        # Serve what we can from the cache and send each remaining text once
+        results = {}
+        missing = {}
+        for key, text in zip(keys, truncated):
+            if key in results or key in missing:
+                continue
+            cached = inference_cache.lookup(key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                missing[key] = text
+
+        if missing:
+            logger.debug("Sending batch of %s inputs to %s", len(missing), model_name)
+            response = self._post(model_name, {"inputs": list(missing.values()), "parameters": parameters})
+            if not isinstance(response, list) or len(response) != len(missing):
+                raise ValueError(f"Unexpected batch response from {model_name}")
+            for key, result in zip(missing, response):
+                inference_cache.store(key, model_name, result)
+                results[key] = result
+
+        return [results[key] for key in keys]
+
+    def _post(self, model_name, payload):
+        """Send one payload to a HuggingFace model and return the decoded response"""
+        if not self.api_key:
+            logger.error("HuggingFace API key not found in environment variables")
+            raise ValueError("HuggingFace API key not configured")
+
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        spec = model_registry.get_model(model_name)
+        try:
+            logger.debug("Sending request to %s", model_name)
+            response = post_inference(model_name, payload, headers, timeout=spec.timeout if spec else None)
+
+            logger.debug("Response status: %s", response.status_code)
+
+            if response.status_code == 401:
+                logger.error("Authentication failed with HuggingFace API")
+                logger.error("Response content: %s", response.text)
+                raise ValueError("Invalid HuggingFace API key")
+            elif response.status_code != 200:
+                logger.error("API request failed with status %s", response.status_code)
+                logger.error("Response content: %s", response.text)
+                raise ValueError(f"API request failed: {response.text}")
+
+            result = response.json()
+            metrics.inc('inference_bytes_total', len(response.request.body or b''), model=model_name, direction='sent')
+            metrics.inc('inference_bytes_total', len(response.content), model=model_name, direction='received')
+            return result
+        except requests.exceptions.RequestException as e:
+            logger.error("Request failed: %s", e)
+            raise
+
+
+class LocalBackend(InferenceBackend):
+    """In-process CPU stand-ins for each registry task, no network needed"""
+
+    name = 'local'
+
+    def analyze(self, text, model_name, task_type="text-generation"):
+        spec = model_registry.get_model(model_name)
+        if spec is None:
+            raise ValueError(f"Model {model_name} is not in the registry")
+        return self.run_task(spec.task, text)
+
+    def run_task(self, task, text):
+        if task == 'summarization':
+            return local_nlp.summarize(text)
+        elif task == 'sentiment':
+            return local_nlp.score_sentiment(text)
+        elif task == 'keywords':
+            return local_nlp.extract_keywords(text)
+        raise ValueError(f"No local implementation for task {task}")
+
+
+local_backend = LocalBackend()
+
+
+def create_backend(mode, api_key):
+    """Backend that runs the models for the given mode"""
+    if mode not in BACKEND_MODES:
+        raise ValueError(f"Unknown inference backend {mode}, expected one of {', '.join(BACKEND_MODES)}")
+    if mode == 'local':
+        return local_backend
+    return RemoteBackend(api_key)
@@ -0,0 +1,111 @@
+"""Profile scores for whole datasets at once, with NumPy.
+
+``score_batch`` takes columns (one array per section of character counts,
+plus strength and improvement counts) and returns the same scores as
+``app.calculate_profile_score`` would give row by row. It does the same
+float operations in the same order and rounds half to even like
+``round``. The command line scores a CSV export in fixed-size chunks, so
+memory stays flat however long the file is:
+
+    python batch_scoring.py candidates.csv -o scores.csv
+
+Each section is read from a ``<section>_length`` column, or else from the
+raw ``<section>`` text. ``strengths`` and ``improvements`` hold counts.
+Missing columns and empty cells count as zero.
+"""
+import sys
+import csv
+import argparse
+import itertools
+
+import numpy as np
+
+from rules import SCORE_REQUIREMENTS, FINDING_POINTS, MAX_FINDING_POINTS, MAX_SCORE
+
+CHUNK_SIZE = 100_000
+
+
+def score_batch(section_lengths, strengths, improvements):
+    """Integer scores for columns of section lengths and strength/improvement counts"""
+    strengths = np.asarray(strengths, dtype=np.int64)
+    improvements = np.asarray(improvements, dtype=np.int64)
+    score = np.zeros(np.broadcast(strengths, improvements).shape, dtype=np.float64)
+
+    for section, requirements in SCORE_REQUIREMENTS.items():
+        lengths = np.asarray(section_lengths.get(section, 0), dtype=np.int64)
+        min_length = requirements['length']
+        max_points = requirements['points']
+        # Short sections earn a share of the points; empty ones earn nothing either way
+        score += np.where(lengths < min_length, (lengths / min_length) * max_points, max_points)
+
+    score += np.minimum(strengths * FINDING_POINTS, MAX_FINDING_POINTS)
+    score -= np.minimum(improvements * FINDING_POINTS, MAX_FINDING_POINTS)
+    return np.rint(np.clip(score, 0, MAX_SCORE)).astype(np.int64)
+
+
+def _count(value):
+    return int(value) if value else 0
+
+
+def score_rows(rows):
+    """Scores for a list of CSV rows (dicts) in the column layout described above"""
+    section_lengths = {}
+    for section in SCORE_REQUIREMENTS:
+        length_column = f"{section}_length"
+        section_lengths[section] = np.fromiter(
+            (_count(row.get(length_column)) if row.get(length_column) is not None else len(row.get(section) or '')
+             for row in rows),
+            dtype=np.int64, count=len(rows)
+        )
+    strengths = np.fromiter((_count(row.get('strengths')) for row in rows), dtype=np.int64, count=len(rows))
+    improvements = np.fromiter((_count(row.get('improvements')) for row in rows), dtype=np.int64, count=len(rows))
+    return score_batch(section_lengths, strengths, improvements)
+
+
+def score_csv(source, target, chunk_size=CHUNK_SIZE, id_column='id'):
+    """Write ``<id>,score`` for every row of a CSV, scoring ``chunk_size`` rows at a time.
+
+    Rows without the id column are identified by their position, starting at 0.
+    Returns the number of rows scored.
+    """
+    reader = csv.DictReader(source)
+    writer = csv.writer(target)
+    has_ids = id_column in (reader.fieldnames or ())
+    writer.writerow([id_column if has_ids else 'index', 'score'])
+
+    scored = 0
+    while True:
+        rows = list(itertools.islice(reader, chunk_size))
+        if not rows:
+            return scored
+        scores = score_rows(rows)
+        ids = (row[id_column] for row in rows) if has_ids else range(scored, scored + len(rows))
+        writer.writerows(zip(ids, scores.tolist()))
+        scored += len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score profiles from a CSV export")
+    parser.add_argument('input', nargs='?', default='-', help="CSV file of profiles, - for stdin")
+    parser.add_argument('-o', '--output', default='-', help="where to write the scores, - for stdout")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="rows scored at a time")
+    parser.add_argument('--id-column', default='id', help="column identifying each profile in the output")
+    args = parser.parse_args(argv)
+
+    # Raw profile sections can be longer than the csv module allows by default
+    csv.field_size_limit(sys.maxsize)
+
+    source = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        score_csv(source, target, args.chunk_size, args.id_column)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import os
+import time
+import threading
+import logging
+from concurrent.futures import Future
+
+import executor
+import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Micro-batching configuration
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '16'))
+BATCH_MAX_WAIT = float(os.getenv('BATCH_MAX_WAIT_MS', '10')) / 1000
+
+
+class MicroBatcher:
+    """Collects inputs for one model and sends them upstream together.
+
+    Inputs submitted within ``max_wait`` of each other, from any request,
+    are sent in a single call to ``send_batch`` (up to ``max_batch_size`` at
+    a time) and the results are scattered back to each caller's Future. A
+    batch is sent as background work only if all of its inputs are, see
+    rate_limiter.priority.
+    """
+
+    def __init__(self, name, send_batch, max_batch_size=BATCH_MAX_SIZE, max_wait=BATCH_MAX_WAIT):
+        self.name = name
+        self.send_batch = send_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self.batches_sent = 0
+        self.items_sent = 0
+
+    def submit(self, inputs, deadline=None):
+        """Queue inputs for the next batch and return one Future per input"""
+        deadline = executor.new_deadline() if deadline is None else deadline
+        futures = [Future() for _ in inputs]
+        with self._cond:
+            self._ensure_thread()
+            now = time.monotonic()
+            batch = rate_limiter.is_batch()
+            self._pending.extend((now, item, future, deadline, batch) for item, future in zip(inputs, futures))
+            self._cond.notify()
+        return futures
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork, so restart the collector in a new worker
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._collect, name=f"batcher-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _collect(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Hold the batch open until it fills up or the oldest input has waited long enough
+                flush_at = self._pending[0][0] + self.max_wait
+                while len(self._pending) < self.max_batch_size:
+                    remaining = flush_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+
+            self.batches_sent += 1
+            self.items_sent += len(batch)
+            deadline = max(entry[3] for entry in batch)
+            executor.submit(self._send, batch, deadline=deadline).add_done_callback(
+                lambda done, batch=batch: self._fail_if_unsent(done, batch)
+            )
+
+    def _send(self, batch):
+        # Skip inputs whose caller already gave up on them
+        live = [(item, future) for _, item, future, _, _ in batch if future.set_running_or_notify_cancel()]
+        if not live:
+            return
+        try:
+            # The collector thread has no priority of its own; the most urgent input sets it
+            with rate_limiter.priority(batch=all(entry[4] for entry in batch)):
+                results = self.send_batch([item for item, _ in live])
+        except Exception as e:
+            for _, future in live:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(live, results):
+            future.set_result(result)
+
+    def _fail_if_unsent(self, done, batch):
+        # The batch may never have run, e.g. no upstream slot before the deadline
+        error = done.exception()
+        if error is None:
+            return
+        for _, _, future, _, _ in batch:
+            if not future.done():
+                try:
+                    future.set_exception(error)
+                except Exception:
+                    pass
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(name, send_batch):
+    """Return the shared batcher for a model, creating it on first use"""
+    with _batchers_lock:
+        batcher = _batchers.get(name)
+        if batcher is None:
+            batcher = MicroBatcher(name, send_batch)
+            _batchers[name] = batcher
+        return batcher
+
+
+def get_stats():
+    with _batchers_lock:
+        batchers = list(_batchers.values())
+    return {
+        'max_batch_size': BATCH_MAX_SIZE,
+        'max_wait_ms': BATCH_MAX_WAIT * 1000,
+        'models': {
+            batcher.name: {
+                'batches_sent': batcher.batches_sent,
+                'items_sent': batcher.items_sent,
+                'avg_batch_size': batcher.items_sent / batcher.batches_sent if batcher.batches_sent else 0.0,
+            }
+            for batcher in batchers
+        },
+    }
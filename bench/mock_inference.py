@@ -0,0 +1,144 @@
+"""Local stand-in for the HuggingFace inference API, used by the benchmarks.
+
+Answers every model the registry ships with in the shape the real API
+uses, after a configurable delay. A share of calls can fail with 500, or
+with the 503 "model is currently loading" response that the inference
+client waits out and retries.
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def task_of(model_name):
+    """Which kind of answer a model gives, guessed from its name"""
+    if 'bart' in model_name or 'summar' in model_name:
+        return 'summarization'
+    if 'sentiment' in model_name:
+        return 'sentiment'
+    return 'keywords'
+
+
+def answer(task, text):
+    """Response body for one input text"""
+    words = text.split()
+    if task == 'summarization':
+        return [{'summary_text': ' '.join(words[:40])}]
+    if task == 'sentiment':
+        stars = 1 + len(words) % 5
+        return [[{'label': f"{stars} stars", 'score': 0.6}, {'label': '3 stars', 'score': 0.2}]]
+    return [
+        {'entity_group': 'KEY', 'word': word.strip('.,').lower(), 'score': 0.9}
+        for word in words[:8] if len(word) > 4
+    ]
+
+
+class MockInference:
+    """Threaded HTTP server mimicking ``{HUGGINGFACE_API_URL}/<model name>``"""
+
+    def __init__(self, latency=0.05, jitter=0.02, error_rate=0.0, loading_rate=0.0,
+                 loading_time=0.2, seed=0, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.loading_rate = loading_rate
+        self.loading_time = loading_time
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = {'ok': 0, 'error': 0, 'loading': 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/models"
+
+    def _draw(self):
+        """Outcome and delay of one call, from the seeded generator"""
+        with self._lock:
+            roll = self._random.random()
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        if roll < self.loading_rate:
+            outcome = 'loading'
+        elif roll < self.loading_rate + self.error_rate:
+            outcome = 'error'
+        else:
+            outcome = 'ok'
+        with self._lock:
+            self.calls[outcome] += 1
+        return outcome, delay
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                model_name = self.path.split('/models/', 1)[-1]
+                outcome, delay = mock._draw()
+                time.sleep(delay)
+
+                if outcome == 'loading':
+                    self._send(503, {'error': f"Model {model_name} is currently loading",
+                                     'estimated_time': mock.loading_time})
+                elif outcome == 'error':
+                    self._send(500, {'error': 'Internal server error'})
+                else:
+                    task = task_of(model_name)
+                    inputs = body.get('inputs', '')
+                    if isinstance(inputs, list):
+                        self._send(200, [answer(task, text) for text in inputs])
+                    else:
+                        self._send(200, answer(task, inputs))
+
+            def _send(self, status, payload):
+                content = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-inference', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the HuggingFace inference API")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds per call")
+    parser.add_argument('--jitter', type=float, default=0.02, help="random +/- seconds added to the latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of calls answered with 500")
+    parser.add_argument('--loading-rate', type=float, default=0.0, help="share of calls answered with 503 model loading")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    mock = MockInference(args.latency, args.jitter, args.error_rate, args.loading_rate,
+                         seed=args.seed, port=args.port).start()
+    print(f"Set HUGGINGFACE_API_URL={mock.url}")
+    try:
+        mock._thread.join()
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Synthetic LinkedIn profiles of a chosen size, the same for the same seed"""
+import random
+
+# Words per profile section for each size
+SIZES = {
+    'small': {'headline': 6, 'summary': 40, 'experience': 60, 'skills': 10, 'education': 8},
+    'medium': {'headline': 10, 'summary': 150, 'experience': 400, 'skills': 30, 'education': 25},
+    'large': {'headline': 14, 'summary': 500, 'experience': 2500, 'skills': 80, 'education': 60},
+}
+
+# Mix of words the rules look for and filler, so that rules both fire and miss
+VOCABULARY = (
+    'leadership managed directed project program technical developed engineer innovative creative '
+    'communicated presented team collaborated analytical research strategic planned degree bachelor '
+    'master certified certification experience achievement results volunteer community mentored '
+    'taught skills expertise network connections goals objectives data analytics cloud aws azure agile '
+    'scrum software market sales finance accounting python java kubernetes customers revenue growth '
+    'delivered built launched improved reduced migrated designed owned scaled operations platform '
+    'product quality security reliability latency pipeline stakeholders roadmap hiring budget'
+).split()
+FILLER = 'the a and for with of to in on across our new several multiple large small'.split()
+
+
+def _words(rng, count):
+    words = [rng.choice(VOCABULARY) if rng.random() < 0.6 else rng.choice(FILLER) for _ in range(count)]
+    sentences = []
+    for start in range(0, len(words), 12):
+        sentence = ' '.join(words[start:start + 12])
+        sentences.append(sentence[:1].upper() + sentence[1:] + '.')
+    return ' '.join(sentences)
+
+
+def make_profile(size='medium', seed=0):
+    """One profile with the sections /analyze expects"""
+    rng = random.Random(f"{size}:{seed}")
+    profile = {section: _words(rng, count) for section, count in SIZES[size].items()}
+    profile['id'] = f"{size}-{seed}"
+    return profile
+
+
+def make_profiles(count, sizes=tuple(SIZES), seed=0):
+    """``count`` distinct profiles cycling through the given sizes"""
+    return [make_profile(sizes[i % len(sizes)], seed * 1_000_000 + i) for i in range(count)]
+
+
+def make_keywords(profile, count=10):
+    """Keyword list shaped like the analysis result, for the pure-function benchmarks"""
+    seen = []
+    for word in profile['skills'].lower().replace('.', '').split():
+        if word in VOCABULARY and word not in seen:
+            seen.append(word)
+    return seen[:count]
@@ -0,0 +1,288 @@
+"""Throughput and latency benchmarks for the analysis service.
+
+Starts the mock inference API and the Flask app on local ports, then drives
+each scenario with synthetic profiles of every requested size:
+
+    python -m bench.run                      # run and compare with bench/baselines.json
+    python -m bench.run --save-baseline      # run and record the new baseline
+    python -m bench.run --scenarios analyze --sizes large --concurrency 32
+
+Exits with status 1 when a scenario is slower than its baseline by more than
+the tolerance. Nothing leaves the machine.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench.mock_inference import MockInference
+from bench.profiles import SIZES, make_profiles, make_keywords
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+PURE_SCENARIOS = ('score', 'strengths', 'suggestions')
+HTTP_SCENARIOS = ('analyze', 'pdf')
+SCENARIOS = PURE_SCENARIOS + HTTP_SCENARIOS
+
+# Settings that change the numbers; a baseline is only compared against a run with the same ones
+CONFIG_KEYS = ('requests', 'iterations', 'concurrency', 'latency', 'jitter', 'error_rate', 'loading_rate', 'seed')
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def measure(call, items, concurrency):
+    """Call ``call(item)`` for every item with ``concurrency`` threads and summarise the timings"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(item):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            ok = call(item) is not False
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        for item in items:
+            timed(item)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed, items))
+    seconds = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(items),
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'throughput_rps': round(len(items) / seconds, 1) if seconds else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def load_app(mock_url, workdir):
+    """Import app.py pointed at the mock API, with its SQLite files in a scratch directory"""
+    os.environ.update(
+        HUGGINGFACE_API_URL=mock_url,
+        HUGGINGFACE_API_KEY='bench',
+        INFERENCE_BACKEND='remote',
+        JOBS_DB=os.path.join(workdir, 'jobs.db'),
+        ANALYSIS_DB=os.path.join(workdir, 'analyses.db'),
+        RATE_LIMIT_DB=os.path.join(workdir, 'rate_limit.db'),
+    )
+    os.environ.pop('INFERENCE_CACHE_DB', None)
+    import app
+    return app
+
+
+def serve(flask_app):
+    """Serve the app on a free local port in a background thread, returning its base URL"""
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-server', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class Client:
+    """One keep-alive session per benchmark thread"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self._local = threading.local()
+
+    def post(self, path, payload):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.post(self.base_url + path, json=payload, timeout=120)
+        response.content
+        return response.status_code == 200
+
+
+def scenario_calls(app, client, size, args):
+    """(call, measured items, warm-up items) for each scenario at one profile size"""
+    from rules import scan_profile
+
+    def prepared(count, seed):
+        profiles = make_profiles(count, (size,), seed)
+        for profile in profiles:
+            profile['_keywords'] = make_keywords(profile)
+        return profiles
+
+    def findings(profile):
+        strengths, improvements = app.analyze_strengths_and_improvements(profile, app.NEUTRAL_SENTIMENT)
+        return {**profile, 'strengths': strengths, 'improvements': improvements}
+
+    def analysis(profile):
+        keywords = profile['_keywords']
+        return {
+            **app.apply_rules(profile, scan_profile(profile), app.NEUTRAL_SENTIMENT, keywords),
+            'keywords': keywords,
+            'name': profile['id'],
+        }
+
+    def without_keywords(profile):
+        return {key: value for key, value in profile.items() if key != '_keywords'}
+
+    warmup = max(1, min(10, args.requests // 10))
+    # Every measured request uses a profile of its own so no cache answers it
+    pure = prepared(args.iterations, args.seed)
+    http = prepared(args.requests + warmup, args.seed + 1)
+
+    return {
+        'score': (app.calculate_profile_score, [findings(p) for p in pure], []),
+        'strengths': (lambda p: app.analyze_strengths_and_improvements(p, app.NEUTRAL_SENTIMENT), pure, []),
+        'suggestions': (lambda p: app.generate_suggestions(p, p['_keywords']), pure, []),
+        'analyze': (lambda p: client.post('/analyze', p),
+                    [without_keywords(p) for p in http[warmup:]], [without_keywords(p) for p in http[:warmup]]),
+        'pdf': (lambda a: client.post('/generate-pdf', a),
+                [analysis(p) for p in http[warmup:]], [analysis(p) for p in http[:warmup]]),
+    }
+
+
+def run(args):
+    mock = MockInference(args.latency, args.jitter, args.error_rate, args.loading_rate, seed=args.seed).start()
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    if args.verbose:
+        import logging_config
+        logging_config.configure()
+    app = load_app(mock.url, workdir)
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+    server, base_url = serve(app.app)
+    client = Client(base_url)
+
+    results = {}
+    try:
+        for size in args.sizes:
+            calls = scenario_calls(app, client, size, args)
+            for scenario in args.scenarios:
+                call, items, warmup = calls[scenario]
+                concurrency = 1 if scenario in PURE_SCENARIOS else args.concurrency
+                measure(call, warmup, concurrency)
+                name = f"{scenario}:{size}"
+                results[name] = measure(call, items, concurrency)
+                print(format_row(name, results[name]), flush=True)
+    finally:
+        server.shutdown()
+        mock.stop()
+    return results
+
+
+def format_row(name, result):
+    return (f"{name:<20} {result['requests']:>6} req {result['errors']:>4} err "
+            f"{result['throughput_rps']:>10.1f} req/s  p50 {result['p50_ms']:>9.3f} ms  "
+            f"p95 {result['p95_ms']:>9.3f} ms  p99 {result['p99_ms']:>9.3f} ms")
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Regressions of the results against a baseline, as printable lines.
+
+    A scenario regresses when it is more than ``tolerance`` slower and also
+    more than ``min_delta_ms`` slower per request, so that timer noise on
+    microsecond calls is not reported.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        p95_delta = result['p95_ms'] - base['p95_ms']
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance) and p95_delta > min_delta_ms:
+            regressions.append(f"{name}: p95 {result['p95_ms']} ms vs baseline {base['p95_ms']} ms")
+        cost_delta = 1000 / max(result['throughput_rps'], 1e-9) - 1000 / max(base['throughput_rps'], 1e-9)
+        if result['throughput_rps'] < base['throughput_rps'] * (1 - tolerance) and cost_delta > min_delta_ms:
+            regressions.append(f"{name}: {result['throughput_rps']} req/s vs baseline {base['throughput_rps']} req/s")
+        if result['errors'] > base['errors']:
+            regressions.append(f"{name}: {result['errors']} errors vs baseline {base['errors']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis service against a local mock inference API")
+    parser.add_argument('--scenarios', type=lambda s: s.split(','), default=list(SCENARIOS),
+                        help=f"comma separated, from {', '.join(SCENARIOS)}")
+    parser.add_argument('--sizes', type=lambda s: s.split(','), default=list(SIZES),
+                        help=f"comma separated profile sizes, from {', '.join(SIZES)}")
+    parser.add_argument('--requests', type=int, default=100, help="HTTP requests per scenario and size")
+    parser.add_argument('--iterations', type=int, default=1000, help="calls per pure-function scenario and size")
+    parser.add_argument('--concurrency', type=int, default=8, help="concurrent HTTP clients")
+    parser.add_argument('--latency', type=float, default=0.05, help="mock inference seconds per call")
+    parser.add_argument('--jitter', type=float, default=0.02, help="random +/- seconds on the mock latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of mock calls failing with 500")
+    parser.add_argument('--loading-rate', type=float, default=0.0, help="share of mock calls answering 503 model loading")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINES_PATH, help="baseline file to compare with or save to")
+    parser.add_argument('--save-baseline', action='store_true', help="record this run as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before a regression is reported")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05,
+                        help="smallest per-request slowdown reported as a regression")
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--verbose', action='store_true', help="keep the application's logging")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.scenarios) - set(SCENARIOS) or set(args.sizes) - set(SIZES)
+    if unknown:
+        parser.error(f"Unknown scenario or size: {', '.join(sorted(unknown))}")
+
+    results = run(args)
+    config = {key: getattr(args, key) for key in CONFIG_KEYS}
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': config, 'results': results}, f, indent=2)
+
+    if args.save_baseline:
+        baselines = {'config': config, 'results': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baselines = json.load(f)
+            if baselines.get('config') != config:
+                baselines = {'config': config, 'results': {}}
+        baselines['results'].update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with, run with --save-baseline to record one")
+        return 0
+    with open(args.baseline) as f:
+        baselines = json.load(f)
+    if baselines.get('config') != config:
+        print("Baseline was recorded with different settings, not comparing")
+        return 0
+
+    regressions = compare(results, baselines['results'], args.tolerance, args.min_delta_ms)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%} of the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Analyze many profiles at once and stream the results as JSON lines.
+
+Used by the ``/analyze/batch`` endpoint and from the command line:
+
+    python bulk_analysis.py profiles.jsonl > results.jsonl
+
+Each input line is one profile object. Each output line carries the
+``index`` of its input line (counting non-blank lines from 0), the
+profile's ``id`` when it has one, and either ``result`` or ``error``.
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from executor import failed_future
+
+logger = logging.getLogger(__name__)
+
+# Bulk analysis configuration
+BULK_CONCURRENCY = int(os.getenv('BULK_CONCURRENCY', '8'))
+BULK_WINDOW = int(os.getenv('BULK_WINDOW', '64'))
+
+ORDERS = ('completion', 'input')
+
+# Profiles get their own threads: each one waits on the shared inference pool,
+# so running them there could leave no threads free for the model calls
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A pool inherited over fork has no live threads, start a new one per process
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=BULK_CONCURRENCY, thread_name_prefix='profile')
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def read_profiles(lines):
+    """Yield (index, profile) per non-blank JSON line; bad lines yield the error instead"""
+    index = 0
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        if not line.strip():
+            continue
+        try:
+            profile = json.loads(line)
+            if not isinstance(profile, dict):
+                raise ValueError("Expected a JSON object per line")
+        except ValueError as e:
+            profile = ValueError(f"Invalid profile line: {str(e)}")
+        yield index, profile
+        index += 1
+
+
+def _outcome(index, profile, future):
+    outcome = {'index': index}
+    if isinstance(profile, dict) and 'id' in profile:
+        outcome['id'] = profile['id']
+    try:
+        outcome['result'] = future.result()
+    except KeyError as e:
+        outcome['error'] = f"Profile is missing the {e} field"
+    except Exception as e:
+        logger.error("Bulk analysis failed for profile %s: %s", index, e)
+        outcome['error'] = str(e)
+    return outcome
+
+
+def analyze_many(profiles, analyze, order='completion', window=BULK_WINDOW):
+    """Run analyze over (index, profile) pairs and yield one outcome dict each.
+
+    At most ``window`` profiles are read ahead of the output, whether they
+    are running or finished and waiting for their turn in input order, so
+    memory stays flat however long the input is. A profile that fails
+    yields an ``error`` outcome and the rest carry on.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Unknown order {order}, expected one of {', '.join(ORDERS)}")
+
+    profiles = iter(profiles)
+    running = {}
+    finished = {}
+    next_index = 0
+    more = True
+    try:
+        while True:
+            while more and len(running) + len(finished) < window:
+                item = next(profiles, None)
+                if item is None:
+                    more = False
+                    break
+                index, profile = item
+                if isinstance(profile, Exception):
+                    future = failed_future(profile)
+                else:
+                    future = _get_pool().submit(analyze, profile)
+                running[future] = (index, profile)
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, profile = running.pop(future)
+                outcome = _outcome(index, profile, future)
+                if order == 'completion':
+                    yield outcome
+                else:
+                    finished[index] = outcome
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+    finally:
+        # The consumer went away (e.g. the client disconnected); drop queued work
+        for future in running:
+            future.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze profiles from a JSON lines file")
+    parser.add_argument('input', nargs='?', default='-', help="JSON lines file of profiles, - for stdin")
+    parser.add_argument('-o', '--output', default='-', help="where to write the results, - for stdout")
+    parser.add_argument('--order', choices=ORDERS, default='completion')
+    parser.add_argument('--window', type=int, default=BULK_WINDOW)
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    import logging_config
+    logging_config.configure()
+    from app import run_batch_analysis
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    failed = 0
+    try:
+        for outcome in analyze_many(read_profiles(source), run_batch_analysis, args.order, args.window):
+            failed += 'error' in outcome
+            target.write(json.dumps(outcome) + '\n')
+            target.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import os
+import threading
+import contextvars
+import time
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future, InvalidStateError, CancelledError, wait
+
+logger = logging.getLogger(__name__)
+
+# Concurrency configuration for upstream inference calls
+MAX_WORKERS = int(os.getenv('INFERENCE_MAX_WORKERS', '32'))
+MAX_IN_FLIGHT = int(os.getenv('INFERENCE_MAX_IN_FLIGHT', '16'))
+ANALYZE_DEADLINE = float(os.getenv('ANALYZE_DEADLINE_SECONDS', '30'))
+
+# Shared by every request in this process; the semaphore caps how many calls
+# are actually talking to the upstream API at any moment.
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+# Deadline of the call holding a slot on this thread, if any
+_slot = threading.local()
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A pool inherited over fork has no live threads, start a new one per process
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='inference')
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def new_deadline(timeout=None):
+    """Absolute monotonic deadline for an analysis starting now"""
+    return time.monotonic() + (ANALYZE_DEADLINE if timeout is None else timeout)
+
+
+def _run_limited(deadline, fn, args, kwargs):
+    """Run fn once an in-flight slot is free, giving up at the deadline"""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0 or not _in_flight.acquire(timeout=remaining):
+        raise TimeoutError(f"Deadline exceeded waiting for an upstream slot for {getattr(fn, '__name__', fn)}")
+    _slot.deadline = deadline
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        if _slot.deadline is not None:
+            _slot.deadline = None
+            _in_flight.release()
+
+
+def current_deadline():
+    """Deadline of the submitted call running on this thread, or None outside one"""
+    return getattr(_slot, 'deadline', None)
+
+
+@contextmanager
+def slot_released():
+    """Hand this thread's in-flight slot to other calls within, and take it back after.
+
+    For waits that are not upstream work, such as waiting for rate limit
+    tokens. Raises TimeoutError if the slot is not free again before the
+    call's deadline. Outside a submitted call it does nothing.
+    """
+    deadline = getattr(_slot, 'deadline', None)
+    if deadline is None:
+        yield
+        return
+    _slot.deadline = None
+    _in_flight.release()
+    try:
+        yield
+    finally:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not _in_flight.acquire(timeout=remaining):
+            raise TimeoutError("Deadline exceeded waiting to get an upstream slot back")
+        _slot.deadline = deadline
+
+
+def submit(fn, *args, deadline=None, **kwargs):
+    """Schedule one upstream call on the shared pool and return its Future.
+
+    The call runs in a copy of the caller's context, so per-request state such
+    as the metrics spans for the Server-Timing header follows it.
+    """
+    deadline = new_deadline() if deadline is None else deadline
+    context = contextvars.copy_context()
+    return _get_pool().submit(context.run, _run_limited, deadline, fn, args, kwargs)
+
+
+def failed_future(error):
+    """A finished Future that raises error, for calls that were never sent"""
+    future = Future()
+    future.set_exception(error)
+    return future
+
+
+def _settle(future, outcome):
+    """Copy a finished future's outcome onto one that may have been cancelled meanwhile"""
+    try:
+        if outcome.cancelled():
+            future.set_exception(CancelledError())
+        elif outcome.exception() is not None:
+            future.set_exception(outcome.exception())
+        else:
+            future.set_result(outcome.result())
+    except InvalidStateError:
+        pass
+
+
+def combine(futures, merge):
+    """A Future for ``merge(results)`` once every one of ``futures`` has finished.
+
+    It fails with the first error among the futures, or from ``merge``. When
+    ``merge`` returns a Future the combined one settles with that Future's
+    outcome, so follow-up calls can be chained without holding a thread
+    while they wait. Cancelling the combined Future cancels everything
+    behind it.
+    """
+    combined = Future()
+    parts = list(futures)
+    remaining = [len(parts)]
+    lock = threading.Lock()
+
+    def part_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        if combined.done():
+            return
+        merged = Future()
+        try:
+            value = merge([part.result() for part in parts])
+        except Exception as e:
+            merged.set_exception(e)
+        else:
+            if isinstance(value, Future):
+                parts.append(value)
+                value.add_done_callback(lambda follow_up: _settle(combined, follow_up))
+                return
+            merged.set_result(value)
+        _settle(combined, merged)
+
+    def cancelled(future):
+        if future.cancelled():
+            for part in list(parts):
+                part.cancel()
+
+    combined.add_done_callback(cancelled)
+    for part in list(parts):
+        part.add_done_callback(part_done)
+    return combined
+
+
+def gather(futures, deadline):
+    """Wait for a dict of futures until they finish or the deadline passes.
+
+    Returns the same mapping where every future is finished. Futures that
+    miss the deadline are cancelled and replaced by one that raises
+    TimeoutError from ``result()``.
+    """
+    wait(futures.values(), timeout=max(0, deadline - time.monotonic()))
+
+    futures = dict(futures)
+    for key, future in futures.items():
+        if not future.done():
+            future.cancel()
+            logger.warning("Call %s did not finish before the deadline", key)
+            futures[key] = failed_future(TimeoutError(f"Call {key} exceeded the analysis deadline"))
+
+    return futures
+
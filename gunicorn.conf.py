@@ -0,0 +1,80 @@
+"""Gunicorn settings for serving the app in production: gunicorn -c gunicorn.conf.py wsgi:app
+
+The application is preloaded in the master: imports, the rule regexes and
+the ReportLab styles are built once and shared by the forked workers.
+Threads never survive a fork, so each worker restarts its own logging
+listener, job workers and PDF processes after it starts. On shutdown a
+worker first finishes the requests it is serving, then gives running
+background jobs time to finish.
+"""
+import os
+import math
+import time
+import threading
+
+from dotenv import load_dotenv
+
+# Read .env here too, so that it can set the server settings below
+load_dotenv()
+
+CPU_COUNT = os.cpu_count() or 1
+
+# Server configuration
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv('WEB_CONCURRENCY', str(CPU_COUNT)))
+
+# Upstream calls allowed at once across all workers, split evenly between them
+if os.getenv('UPSTREAM_MAX_IN_FLIGHT'):
+    os.environ.setdefault(
+        'INFERENCE_MAX_IN_FLIGHT', str(max(1, math.ceil(int(os.getenv('UPSTREAM_MAX_IN_FLIGHT')) / workers)))
+    )
+INFERENCE_MAX_IN_FLIGHT = int(os.getenv('INFERENCE_MAX_IN_FLIGHT', '16'))
+
+# Requests mostly wait on the upstream API, so each worker gets a request
+# thread per upstream slot
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', str(max(8, INFERENCE_MAX_IN_FLIGHT))))
+
+# Share the CPUs between the workers' PDF processes instead of giving each worker all of them
+os.environ.setdefault('PDF_WORKERS', str(max(1, CPU_COUNT // workers)))
+
+preload_app = True
+
+# Long enough for an analysis to run to its deadline, or a report to render,
+# plus the time given to background jobs
+JOBS_DRAIN_SECONDS = float(os.getenv('JOBS_DRAIN_SECONDS', '30'))
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', str(int(max(
+    float(os.getenv('ANALYZE_DEADLINE_SECONDS', '30')),
+    float(os.getenv('PDF_RENDER_TIMEOUT_SECONDS', '60')),
+) + JOBS_DRAIN_SECONDS + 5))))
+keepalive = 5
+
+# Gunicorn's own log goes to stderr; set ACCESS_LOG=- to log every request too
+accesslog = os.getenv('ACCESS_LOG')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.perf_counter()
+    import logging_config
+    logging_config.configure()
+
+
+def post_worker_init(worker):
+    import pdf_report
+    from app import job_queue
+
+    job_queue.start()
+    # Start the PDF processes in the background so the worker serves requests meanwhile
+    threading.Thread(target=pdf_report.warm_up, name='pdf-warm-up', daemon=True).start()
+    worker.log.info("Worker %s ready in %.0f ms", worker.pid, (time.perf_counter() - worker.forked_at) * 1000)
+
+
+def worker_exit(server, worker):
+    import pdf_report
+    import logging_config
+    from app import job_queue
+
+    job_queue.stop(timeout=JOBS_DRAIN_SECONDS)
+    pdf_report.shutdown()
+    logging_config.shutdown()
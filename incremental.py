@@ -0,0 +1,87 @@
+"""Incremental re-analysis of an edited profile.
+
+The analysis is a small graph of stages. Each stage's fingerprint hashes
+the profile sections it reads together with the outputs of the stages it
+depends on. When a request carries the id of an earlier analysis, every
+stage whose fingerprint is unchanged reuses that analysis' output instead
+of running again. Because fingerprints use upstream outputs rather than
+upstream fingerprints, a stage that re-runs but produces the same output
+does not force the stages after it to re-run.
+"""
+import json
+import hashlib
+
+import analysis_store
+
+SECTIONS = ('headline', 'summary', 'experience', 'skills', 'education')
+
+# Stage -> (profile sections it reads, stages whose output it reads)
+KEYWORD_STAGES = tuple(f"keywords:{section}" for section in SECTIONS)
+STAGE_GRAPH = {
+    **{stage: ((section,), ()) for stage, section in zip(KEYWORD_STAGES, SECTIONS)},
+    'summary': (SECTIONS, ()),
+    'sentiment': (SECTIONS, ()),
+    'rules': (SECTIONS, ('sentiment', *KEYWORD_STAGES)),
+    'score': (SECTIONS, ('rules',)),
+}
+
+
+def _digest(value):
+    material = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class IncrementalAnalysis:
+    """Tracks which stages of one analysis can reuse a previous analysis' output.
+
+    Stages must be settled in dependency order: ask whether a stage is
+    ``stale`` and, if it is, ``record`` its new output. Either way
+    ``output`` returns the stage's output afterwards.
+    """
+
+    def __init__(self, data, previous=None):
+        self.section_fingerprints = {section: _digest(data[section]) for section in SECTIONS}
+        self.previous = previous or {'fingerprints': {}, 'outputs': {}}
+        self.fingerprints = {}
+        self.outputs = {}
+        self.recomputed = []
+
+    def _fingerprint(self, stage):
+        sections, upstream = STAGE_GRAPH[stage]
+        return _digest([
+            stage,
+            [self.section_fingerprints[section] for section in sections],
+            [_digest(self.outputs[dependency]) for dependency in upstream],
+        ])
+
+    def stale(self, stage):
+        """Whether a stage has to run; if not, its previous output is taken over"""
+        fingerprint = self.fingerprints[stage] = self._fingerprint(stage)
+        if self.previous['fingerprints'].get(stage) != fingerprint:
+            return True
+        self.outputs[stage] = self.previous['outputs'][stage]
+        return False
+
+    def output(self, stage):
+        return self.outputs[stage]
+
+    def record(self, stage, output, reusable=True):
+        """Store a stage's new output; outputs from failed model calls are not reused later"""
+        if stage not in self.fingerprints:
+            self.fingerprints[stage] = self._fingerprint(stage)
+        self.outputs[stage] = output
+        self.recomputed.append(stage)
+        if not reusable:
+            self.fingerprints[stage] = None
+
+    def snapshot(self):
+        """What a later re-analysis needs from this one, kept in the analysis store"""
+        return {
+            'fingerprints': {stage: fp for stage, fp in self.fingerprints.items() if fp is not None},
+            'outputs': self.outputs,
+        }
+
+
+def start(data):
+    """Incremental analysis of a profile, reusing the stored analysis named by its analysis_id"""
+    return IncrementalAnalysis(data, analysis_store.get_snapshot(data.get('analysis_id')))
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+CACHE_MAX_ENTRIES = int(os.getenv('INFERENCE_CACHE_MAX_ENTRIES', '2048'))
+CACHE_TTL = float(os.getenv('INFERENCE_CACHE_TTL_SECONDS', '86400'))
+# Optional SQLite file shared by all workers on the host, disabled when unset
+CACHE_DB_PATH = os.getenv('INFERENCE_CACHE_DB')
+
+
+def cache_key(model_name, text, parameters):
+    """Content hash identifying one model invocation"""
+    material = json.dumps([model_name, text, parameters], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with a per-entry TTL"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            model_name, value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, model_name, value, expires_at=None):
+        with self._lock:
+            self._entries[key] = (model_name, value, expires_at or time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_model(self, model_name):
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[0] == model_name]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """Shared cache tier in a SQLite file so gunicorn workers reuse each other's results"""
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS inference_cache ('
+                'key TEXT PRIMARY KEY, model TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS inference_cache_model ON inference_cache (model)')
+        self.purge_expired()
+
+    def _connect(self):
+        # sqlite3 connections must not be shared between threads or processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT model, value, expires_at FROM inference_cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or row[2] < time.time():
+            return None
+        return row[0], json.loads(row[1]), row[2]
+
+    def set(self, key, model_name, value):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO inference_cache (key, model, value, expires_at) VALUES (?, ?, ?, ?)',
+                (key, model_name, json.dumps(value), time.time() + self.ttl)
+            )
+
+    def invalidate_model(self, model_name):
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM inference_cache WHERE model = ?', (model_name,)).rowcount
+
+    def purge_expired(self):
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM inference_cache WHERE expires_at < ?', (time.time(),)).rowcount
+
+
+_memory = LRUCache(CACHE_MAX_ENTRIES, CACHE_TTL)
+_shared = SQLiteCache(CACHE_DB_PATH, CACHE_TTL) if CACHE_DB_PATH else None
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'stores': 0, 'errors': 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def lookup(key):
+    """Look a result up in memory first, then in the shared tier"""
+    value = _memory.get(key)
+    if value is not None:
+        _count('hits')
+        return value
+
+    if _shared is not None:
+        try:
+            row = _shared.get(key)
+        except sqlite3.Error as e:
+            _count('errors')
+            logger.error("Shared inference cache lookup failed: %s", e)
+            row = None
+        if row is not None:
+            _count('shared_hits')
+            # Promote into memory, keeping the shared expiry
+            model_name, value, expires_at = row
+            _memory.set(key, model_name, value, expires_at)
+            return value
+
+    _count('misses')
+    return None
+
+
+def store(key, model_name, value):
+    """Store a successful model result in every tier"""
+    _memory.set(key, model_name, value)
+    _count('stores')
+    if _shared is not None:
+        try:
+            _shared.set(key, model_name, value)
+        except sqlite3.Error as e:
+            _count('errors')
+            logger.error("Shared inference cache store failed: %s", e)
+
+
+def invalidate_model(model_name):
+    """Drop every cached result for one model, returning how many entries were removed"""
+    removed = _memory.invalidate_model(model_name)
+    if _shared is not None:
+        removed += _shared.invalidate_model(model_name)
+    logger.info("Invalidated %s cached results for %s", removed, model_name)
+    return removed
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['shared_hits'] + stats['misses']
+    stats['hit_rate'] = (stats['hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+    stats['memory_entries'] = len(_memory)
+    stats['max_entries'] = CACHE_MAX_ENTRIES
+    stats['ttl_seconds'] = CACHE_TTL
+    stats['shared_tier'] = CACHE_DB_PATH
+    return stats
@@ -0,0 +1,170 @@
+import os
+import time
+import random
+import threading
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+
+import rate_limiter
+import model_registry
+from executor import slot_released, current_deadline
+
+logger = logging.getLogger(__name__)
+
+# HuggingFace API configuration
+API_URL = os.getenv('HUGGINGFACE_API_URL', "https://api-inference.huggingface.co/models")
+
+# Connection pool and timeout configuration
+POOL_CONNECTIONS = int(os.getenv('HF_POOL_CONNECTIONS', '4'))
+POOL_MAXSIZE = int(os.getenv('HF_POOL_MAXSIZE', '16'))
+CONNECT_TIMEOUT = float(os.getenv('HF_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.getenv('HF_READ_TIMEOUT', '30'))
+
+# Retry configuration for 429 (rate limited) and 503 (model loading) responses
+MAX_RETRIES = int(os.getenv('HF_MAX_RETRIES', '3'))
+BACKOFF_BASE = float(os.getenv('HF_BACKOFF_BASE', '0.5'))
+MAX_BACKOFF = float(os.getenv('HF_MAX_BACKOFF', '20'))
+RETRY_STATUSES = {429, 503}
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=False)
+_session.mount('https://', _adapter)
+_session.mount('http://', _adapter)
+
+_stats_lock = threading.Lock()
+_stats = {
+    'requests': 0,
+    'retries': 0,
+    'retries_by_status': {},
+    'model_loading_waits': 0,
+    'backoff_seconds': 0.0,
+    'timeouts': 0,
+    'connection_errors': 0,
+    'exhausted': 0,
+    'past_deadline': 0,
+}
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _retry_delay(response, attempt):
+    """Work out how long to wait before retrying a 429/503 response"""
+    # Full jitter exponential backoff as the baseline
+    delay = random.uniform(0, min(MAX_BACKOFF, BACKOFF_BASE * (2 ** attempt)))
+
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+
+    # While a model is loading the API reports how long it expects to take
+    if response.status_code == 503:
+        try:
+            estimated_time = float(response.json().get('estimated_time', 0))
+        except (ValueError, AttributeError):
+            estimated_time = 0
+        if estimated_time:
+            _count('model_loading_waits')
+            delay = max(delay, estimated_time + random.uniform(0, BACKOFF_BASE))
+
+    return min(delay, MAX_BACKOFF)
+
+
+def post_inference(model_name, payload, headers, timeout=None, deadline=None):
+    """POST a payload to a model endpoint, retrying rate limits and model loading.
+
+    Returns the final ``requests.Response``; callers decide what a non-200
+    status means. Connection errors and timeouts are raised as-is. Every
+    attempt first takes a token from the shared quota, see rate_limiter.py,
+    and raises ``RateLimited`` if it gets none.
+
+    No retry is made that would wait past ``deadline`` (a monotonic time),
+    by default that of the submitted call this runs in; the last response
+    is returned instead.
+
+    Each HTTP attempt is fed to the model's breaker on its own, timed
+    without the quota and backoff waits around it. 429 and 503 attempts are
+    left out: they are about our quota or a model still loading, not about
+    how the model performs.
+    """
+    timeout = (CONNECT_TIMEOUT, READ_TIMEOUT if timeout is None else timeout)
+    deadline = current_deadline() if deadline is None else deadline
+    url = f"{API_URL}/{model_name}"
+
+    for attempt in range(MAX_RETRIES + 1):
+        # Waiting for quota leaves the in-flight slot to calls that already have a token
+        rate_limiter.acquire(waiting=slot_released)
+        _count('requests')
+        started = time.monotonic()
+        try:
+            response = _session.post(url, headers=headers, json=payload, timeout=timeout)
+        except requests.exceptions.Timeout:
+            _count('timeouts')
+            model_registry.record_result(model_name, time.monotonic() - started, False)
+            raise
+        except requests.exceptions.ConnectionError:
+            _count('connection_errors')
+            model_registry.record_result(model_name, time.monotonic() - started, False)
+            raise
+        if response.status_code not in RETRY_STATUSES:
+            model_registry.record_result(model_name, time.monotonic() - started, response.status_code == 200)
+
+        if response.status_code == 429:
+            rate_limiter.throttled(response.headers.get('Retry-After'))
+        if response.status_code not in RETRY_STATUSES:
+            return response
+        if attempt == MAX_RETRIES:
+            _count('exhausted')
+            return response
+
+        delay = _retry_delay(response, attempt)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            # Nobody will be waiting for the answer by then
+            _count('past_deadline')
+            return response
+        with _stats_lock:
+            _stats['retries'] += 1
+            _stats['backoff_seconds'] += delay
+            by_status = _stats['retries_by_status']
+            by_status[response.status_code] = by_status.get(response.status_code, 0) + 1
+        logger.warning("%s returned %s, retrying in %.2fs (attempt %s/%s)", model_name, response.status_code, delay, attempt + 1, MAX_RETRIES)
+        with slot_released():
+            time.sleep(delay)
+
+    return response
+
+
+def get_stats():
+    """Snapshot of request/retry counters and connection pool usage"""
+    with _stats_lock:
+        stats = {**_stats, 'retries_by_status': dict(_stats['retries_by_status'])}
+
+    pools = []
+    pool_manager = _adapter.poolmanager
+    for key in pool_manager.pools.keys():
+        pool = pool_manager.pools.get(key)
+        if pool is None:
+            continue
+        pools.append({
+            'host': f"{pool.scheme}://{pool.host}:{pool.port}",
+            'connections_opened': pool.num_connections,
+            'requests_sent': pool.num_requests,
+            'idle_connections': sum(1 for conn in list(pool.pool.queue) if conn) if pool.pool is not None else 0,
+            'maxsize': pool_manager.connection_pool_kw.get('maxsize', POOL_MAXSIZE),
+        })
+
+    stats['pools'] = pools
+    stats['config'] = {
+        'pool_connections': POOL_CONNECTIONS,
+        'pool_maxsize': POOL_MAXSIZE,
+        'connect_timeout': CONNECT_TIMEOUT,
+        'read_timeout': READ_TIMEOUT,
+        'max_retries': MAX_RETRIES,
+    }
+    return stats
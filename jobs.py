@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Background job configuration
+JOBS_DB_PATH = os.getenv('JOBS_DB', 'jobs.db')
+JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', '4'))
+JOBS_MAX_PENDING = int(os.getenv('JOBS_MAX_PENDING', '100'))
+JOBS_RETENTION = float(os.getenv('JOBS_RETENTION_SECONDS', '86400'))
+# A running job not heard from for this long is assumed lost with its worker and runs again
+JOBS_LEASE = float(os.getenv('JOBS_LEASE_SECONDS', '300'))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', '3'))
+JOBS_POLL_INTERVAL = 1.0
+
+STATUSES = ('queued', 'running', 'done', 'failed')
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while too many are already pending"""
+
+
+class JobQueue:
+    """Analysis jobs kept in SQLite and run by background worker threads.
+
+    Jobs survive a restart: anything still queued, or running in a worker
+    that went away, is picked up again once its lease runs out. Several
+    processes may share the same database; a job is claimed by exactly one
+    of them.
+    """
+
+    def __init__(self, handler, path=JOBS_DB_PATH, workers=JOBS_WORKERS, max_pending=JOBS_MAX_PENDING):
+        self.handler = handler
+        self.path = path
+        self.workers = workers
+        self.max_pending = max_pending
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads_lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, stages TEXT NOT NULL, '
+                'result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, '
+                'created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+        self.purge_finished()
+
+    def _connect(self):
+        # sqlite3 connections must not be shared between threads or processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def start(self):
+        """Start the worker threads for this process if they are not running"""
+        with self._threads_lock:
+            # Threads do not survive a fork, so each worker process starts its own
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping = threading.Event()
+            self._threads = [
+                threading.Thread(target=self._work, name=f"jobs-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            logger.info("Started %s job workers", self.workers)
+
+    def stop(self, timeout=None):
+        """Stop claiming jobs and wait up to ``timeout`` seconds for running ones to finish.
+
+        Returns how many jobs were still running; their lease runs out and
+        another worker runs them again.
+        """
+        with self._threads_lock:
+            if self._pid != os.getpid():
+                return 0
+            threads = list(self._threads)
+        self._stopping.set()
+        self._wakeup.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in threads:
+            thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        running = sum(thread.is_alive() for thread in threads)
+        if running:
+            logger.warning("%s jobs still running at shutdown will be retried", running)
+        return running
+
+    def submit(self, payload):
+        """Queue a job and return its id, or raise QueueFull"""
+        self.start()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+            if pending >= self.max_pending:
+                raise QueueFull(f"{pending} jobs are already pending")
+            conn.execute(
+                'INSERT INTO jobs (id, status, payload, stages, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, 'queued', json.dumps(payload), '{}', now, now)
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """Status, stage progress and outcome of a job, or None if it is unknown"""
+        self.start()
+        row = self._connect().execute(
+            'SELECT status, stages, result, error, attempts, created_at, updated_at FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, stages, result, error, attempts, created_at, updated_at = row
+        job = {
+            'id': job_id,
+            'status': status,
+            'stages': json.loads(stages),
+            'attempts': attempts,
+            'created_at': created_at,
+            'updated_at': updated_at,
+        }
+        if result is not None:
+            job['result'] = json.loads(result)
+        if error is not None:
+            job['error'] = error
+        return job
+
+    def _claim(self):
+        """Atomically take the oldest runnable job, returning (id, payload) or None"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT id, payload, attempts FROM jobs "
+                "WHERE status = 'queued' OR (status = 'running' AND updated_at < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now - JOBS_LEASE,)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            job_id, payload, attempts = row
+            if attempts >= JOBS_MAX_ATTEMPTS:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                    (f"Gave up after {attempts} attempts", now, job_id)
+                )
+                conn.execute('COMMIT')
+                logger.error("Job %s abandoned after %s attempts", job_id, attempts)
+                return job_id, None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', stages = '{}', attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                (now, job_id)
+            )
+            conn.execute('COMMIT')
+            return job_id, json.loads(payload)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _work(self):
+        stopping = self._stopping
+        while not stopping.is_set():
+            try:
+                claimed = self._claim()
+            except sqlite3.Error as e:
+                logger.error("Error claiming job: %s", e)
+                claimed = None
+            if claimed is None:
+                # Jobs submitted by other processes are only seen by polling
+                self._wakeup.wait(JOBS_POLL_INTERVAL)
+                if not stopping.is_set():
+                    self._wakeup.clear()
+                continue
+            job_id, payload = claimed
+            if payload is None:
+                continue
+            try:
+                self._run(job_id, payload)
+            except sqlite3.Error as e:
+                # The job's lease runs out and another worker retries it
+                logger.error("Error recording outcome of job %s: %s", job_id, e)
+
+    def _run(self, job_id, payload):
+        stages = {}
+        stages_lock = threading.Lock()
+
+        def progress(stage, status):
+            # Called from the inference threads as each model stage finishes;
+            # writes stay under the lock so an older snapshot never lands last
+            with stages_lock:
+                stages[stage] = status
+                try:
+                    self._update(job_id, stages=json.dumps(stages))
+                except sqlite3.Error as e:
+                    logger.error("Error recording progress for job %s: %s", job_id, e)
+
+        logger.info("Running job %s", job_id)
+        try:
+            result = self.handler(payload, progress)
+        except Exception as e:
+            logger.error("Job %s failed: %s", job_id, e)
+            self._update(job_id, status='failed', error=str(e))
+            return
+        self._update(job_id, status='done', result=json.dumps(result))
+
+    def _update(self, job_id, **columns):
+        columns['updated_at'] = time.time()
+        assignments = ', '.join(f"{column} = ?" for column in columns)
+        self._connect().execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ?", (*columns.values(), job_id)
+        )
+
+    def purge_finished(self):
+        """Drop finished jobs older than the retention period"""
+        return self._connect().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+            (time.time() - JOBS_RETENTION,)
+        ).rowcount
+
+    def get_stats(self):
+        counts = dict(self._connect().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        return {
+            'workers': len(self._threads) if self._pid == os.getpid() else 0,
+            'max_pending': self.max_pending,
+            **{status: counts.get(status, 0) for status in STATUSES},
+        }
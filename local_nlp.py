@@ -0,0 +1,138 @@
+"""Lightweight in-process NLP used by the local inference backend.
+
+Everything here is pure Python with no models to download, so it runs
+offline, without a GPU and fast enough to serve every request. Results are
+returned in the same shapes the HuggingFace API uses for each task.
+"""
+import re
+import math
+from collections import Counter
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each etc few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most my
+myself no nor not now of off on once only or other our ours ourselves out over own same she should so
+some such than that the their theirs them themselves then there these they this those through to too
+under until up very was we were what when where which while who whom why will with would you your yours
+yourself yourselves headline summary experience skills education using used use including within across
+""".split())
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.\-']*[a-z0-9+#]|[a-z0-9]")
+_PHRASE_SPLIT_RE = re.compile(r"[\n\r\t,;:!?()\[\]{}|/\\\"•·–—]+|\.(?=\s|$)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Word weights for the sentiment scorer, roughly in [-3, 3]
+POSITIVE_WORDS = {
+    'achieved': 2, 'accomplished': 2, 'award': 2, 'awarded': 2, 'successful': 2, 'success': 2,
+    'led': 1.5, 'lead': 1, 'leading': 1, 'improved': 2, 'increased': 1.5, 'grew': 1.5, 'growth': 1,
+    'delivered': 1.5, 'launched': 1.5, 'built': 1, 'created': 1, 'designed': 1, 'developed': 1,
+    'innovative': 2, 'passionate': 2, 'excellent': 3, 'outstanding': 3, 'exceptional': 3, 'strong': 1.5,
+    'expert': 2, 'skilled': 1.5, 'proficient': 1.5, 'dedicated': 1.5, 'driven': 1.5, 'motivated': 1.5,
+    'effective': 1.5, 'efficient': 1.5, 'proven': 2, 'recognized': 2, 'top': 1.5, 'best': 2,
+    'collaborative': 1, 'creative': 1.5, 'reliable': 1, 'results': 1, 'impact': 1, 'enthusiastic': 2,
+    'optimized': 1.5, 'streamlined': 1.5, 'mentored': 1, 'promoted': 2, 'exceeded': 2.5, 'win': 1.5,
+}
+NEGATIVE_WORDS = {
+    'failed': -2, 'failure': -2, 'unemployed': -1.5, 'fired': -2.5, 'poor': -2, 'weak': -1.5,
+    'struggled': -1.5, 'difficult': -1, 'problem': -0.5, 'problems': -0.5, 'lack': -1.5, 'lacking': -1.5,
+    'limited': -1, 'mediocre': -2, 'bad': -2, 'boring': -2, 'hate': -3, 'unfortunately': -1.5,
+    'declined': -1.5, 'decreased': -1, 'lost': -1.5, 'mistake': -1.5, 'unable': -1.5, 'never': -1,
+}
+NEGATIONS = {'not', 'no', 'never', "n't", 'without', 'hardly'}
+
+
+def tokenize(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in _SENTENCE_RE.split(text) if sentence.strip()]
+
+
+def extract_keywords(text, top_n=10):
+    """RAKE keyword extraction, returned as token-classification entities.
+
+    Candidate phrases are runs of non-stopwords between punctuation; each
+    phrase scores the sum of its words' degree/frequency ratio.
+    """
+    candidates = []
+    for fragment in _PHRASE_SPLIT_RE.split(text.lower()):
+        phrase = []
+        for word in tokenize(fragment):
+            if word in STOPWORDS or not any(char.isalpha() for char in word):
+                if phrase:
+                    candidates.append(tuple(phrase))
+                phrase = []
+            else:
+                phrase.append(word)
+        if phrase:
+            candidates.append(tuple(phrase))
+
+    # Very long runs are usually lists rather than key phrases
+    candidates = [phrase for phrase in candidates if len(phrase) <= 4]
+    if not candidates:
+        return []
+
+    frequency = Counter()
+    degree = Counter()
+    for phrase in candidates:
+        for word in phrase:
+            frequency[word] += 1
+            degree[word] += len(phrase)
+
+    scores = {}
+    for phrase in set(candidates):
+        scores[phrase] = sum(degree[word] / frequency[word] for word in phrase)
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_n]
+    top_score = ranked[0][1]
+    return [
+        {'entity_group': 'KEY', 'word': ' '.join(phrase), 'score': round(score / top_score, 4)}
+        for phrase, score in ranked
+    ]
+
+
+def score_sentiment(text):
+    """Lexicon sentiment mapped onto the 1-5 star labels of the remote model"""
+    total = 0.0
+    hits = 0
+    negate = 0
+    for word in tokenize(text):
+        if word in NEGATIONS or word.endswith("n't"):
+            negate = 3
+            continue
+        weight = POSITIVE_WORDS.get(word) or NEGATIVE_WORDS.get(word)
+        if weight:
+            total += -weight if negate else weight
+            hits += 1
+        negate = max(0, negate - 1)
+
+    # Squash the average weight into (-1, 1) then onto 1..5 stars
+    polarity = math.tanh(total / (hits + 2)) if hits else 0.0
+    stars = min(5, max(1, int(round(3 + 2 * polarity))))
+    confidence = round(0.5 + abs(polarity) / 2, 4)
+    return [{'label': f"{stars} star" if stars == 1 else f"{stars} stars", 'score': confidence}]
+
+
+def summarize(text, max_sentences=3):
+    """Extractive summary: the highest scoring sentences in original order"""
+    sentences = split_sentences(text)
+    if len(sentences) <= max_sentences:
+        return [{'summary_text': ' '.join(sentences)}]
+
+    frequency = Counter(word for word in tokenize(text) if word not in STOPWORDS)
+    if not frequency:
+        return [{'summary_text': ' '.join(sentences[:max_sentences])}]
+    top = max(frequency.values())
+
+    scored = []
+    for index, sentence in enumerate(sentences):
+        words = [word for word in tokenize(sentence) if word not in STOPWORDS]
+        if not words:
+            continue
+        score = sum(frequency[word] / top for word in words) / math.sqrt(len(words))
+        scored.append((score, index, sentence))
+
+    chosen = sorted(sorted(scored, reverse=True)[:max_sentences], key=lambda item: item[1])
+    return [{'summary_text': ' '.join(sentence for _, _, sentence in chosen)}]
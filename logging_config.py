@@ -0,0 +1,201 @@
+"""Logging for the application: queued, size-capped and redacted.
+
+Request threads only put the log record on a queue. A listener thread
+formats and writes it. Profile sections and long values are redacted or
+truncated there, and anything that looks like an API key is masked.
+Messages use %-style arguments, so a record below the configured level
+costs no formatting at all.
+"""
+import os
+import re
+import sys
+import copy
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+# Logging configuration
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# Per-component levels, e.g. "backends=DEBUG,jobs=WARNING,werkzeug=WARNING"
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_MAX_FIELD_CHARS = int(os.getenv('LOG_MAX_FIELD_CHARS', '200'))
+LOG_MAX_MESSAGE_CHARS = int(os.getenv('LOG_MAX_MESSAGE_CHARS', '2000'))
+# Profile fields logged only as their length, as they hold personal data
+LOG_REDACT_FIELDS = frozenset(
+    field.strip() for field in os.getenv('LOG_REDACT_FIELDS', 'headline,summary,experience,skills,education').split(',')
+    if field.strip()
+)
+# Most items of a list or dict argument that are logged
+LOG_MAX_ITEMS = 20
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+SECRET_RE = re.compile(r'(Bearer\s+|hf_)[A-Za-z0-9._-]+')
+
+
+def parse_levels(spec):
+    """'backends=DEBUG,jobs=WARNING' -> {'backends': 'DEBUG', 'jobs': 'WARNING'}"""
+    levels = {}
+    for entry in spec.split(','):
+        name, _, level = entry.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _truncate(text):
+    if len(text) <= LOG_MAX_FIELD_CHARS:
+        return text
+    return f"{text[:LOG_MAX_FIELD_CHARS]}...(+{len(text) - LOG_MAX_FIELD_CHARS} chars)"
+
+
+def scrub(value, depth=0):
+    """A loggable version of a log argument: redacted, truncated and shallow"""
+    if isinstance(value, str):
+        return _truncate(value)
+    if depth >= 2:
+        return f"<{type(value).__name__}>"
+    if isinstance(value, dict):
+        items = list(value.items())
+        scrubbed = {
+            key: f"<{len(item)} chars>" if key in LOG_REDACT_FIELDS and isinstance(item, str) else scrub(item, depth + 1)
+            for key, item in items[:LOG_MAX_ITEMS]
+        }
+        if len(items) > LOG_MAX_ITEMS:
+            scrubbed['...'] = f"+{len(items) - LOG_MAX_ITEMS} keys"
+        return scrubbed
+    if isinstance(value, (list, tuple)):
+        scrubbed = [scrub(item, depth + 1) for item in value[:LOG_MAX_ITEMS]]
+        if len(value) > LOG_MAX_ITEMS:
+            scrubbed.append(f"...+{len(value) - LOG_MAX_ITEMS} items")
+        return scrubbed
+    if isinstance(value, BaseException):
+        return _truncate(str(value))
+    return value
+
+
+class RedactingFilter(logging.Filter):
+    """Scrubs a record's arguments and caps and masks its final message"""
+
+    def filter(self, record):
+        if isinstance(record.args, dict):
+            record.args = scrub(record.args)
+        elif record.args:
+            record.args = tuple(scrub(arg) for arg in record.args)
+        message = SECRET_RE.sub(r'\1[redacted]', record.getMessage())
+        if len(message) > LOG_MAX_MESSAGE_CHARS:
+            message = f"{message[:LOG_MAX_MESSAGE_CHARS]}...(+{len(message) - LOG_MAX_MESSAGE_CHARS} chars)"
+        record.msg, record.args = message, None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log collectors"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queues records without formatting them and drops them when the queue is full.
+
+    The listener thread lives in the same process, so records need not be
+    made picklable here; that formatting is exactly what should stay off
+    the request thread.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            # Tracebacks refer to frames that keep changing once the caller returns
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_lock = threading.Lock()
+_queue = None
+_handler = None
+_listener = None
+_pid = None
+
+
+def _output_handler():
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT))
+    handler.addFilter(RedactingFilter())
+    return handler
+
+
+def configure():
+    """Route all logging through the queue; safe to call again, e.g. after a fork.
+
+    This replaces the root logger's handlers, so only entry points call it:
+    ``python app.py``, wsgi.py, the gunicorn ``post_fork`` hook and the
+    command line tools that run analyses.
+    """
+    global _queue, _handler, _listener, _pid
+    with _lock:
+        if _pid == os.getpid():
+            return
+        # A forked child inherits the queue handler but not the listener thread
+        root = logging.getLogger()
+        if _handler is not None:
+            root.removeHandler(_handler)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+
+        _queue = queue.Queue(LOG_QUEUE_SIZE)
+        _handler = DroppingQueueHandler(_queue)
+        _listener = logging.handlers.QueueListener(_queue, _output_handler(), respect_handler_level=True)
+        _listener.start()
+        _pid = os.getpid()
+
+        root.addHandler(_handler)
+        root.setLevel(LOG_LEVEL)
+        for name, level in parse_levels(LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+
+
+def shutdown():
+    """Write out whatever is still queued"""
+    global _listener
+    with _lock:
+        if _listener is not None and _pid == os.getpid():
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown)
+
+
+def get_stats():
+    return {
+        'level': LOG_LEVEL,
+        'components': parse_levels(LOG_LEVELS),
+        'format': LOG_FORMAT,
+        'queued': _queue.qsize() if _queue is not None else 0,
+        'dropped': _handler.dropped if _handler is not None else 0,
+    }
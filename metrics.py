@@ -0,0 +1,192 @@
+"""Timing spans, counters and histograms exposed in the Prometheus text format.
+
+Pipeline stages are wrapped in ``span(...)``, which records the duration in
+the ``stage_duration_seconds`` histogram. Spans that run while handling a
+request are also collected for that request's ``Server-Timing`` header. The
+collection lives in a context variable, and ``executor.submit`` runs calls
+in a copy of the caller's context, so model calls made on the inference
+threads are attributed to the request that started them. Keyword batches
+are shared between requests and run in the batcher's context instead; a
+request sees them as its ``keywords_wait`` span.
+"""
+import os
+import re
+import time
+import bisect
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+# Metrics configuration
+METRICS_PREFIX = os.getenv('METRICS_PREFIX', 'profile_optimizer')
+# Recent observations per series used for the p50/p95/p99 summaries
+METRICS_WINDOW = int(os.getenv('METRICS_WINDOW', '1024'))
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+HELP = {
+    'stage_duration_seconds': 'Time spent in each analysis pipeline stage',
+    'http_request_duration_seconds': 'Time spent handling each HTTP request',
+    'http_requests_total': 'HTTP requests handled',
+    'inference_bytes_total': 'Bytes sent to and received from the inference API',
+}
+
+
+class Histogram:
+    """Cumulative buckets for Prometheus plus a window of recent values for percentiles"""
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=METRICS_WINDOW)
+
+    def observe(self, value):
+        index = bisect.bisect_left(BUCKETS, value)
+        if index < len(BUCKETS):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantiles(self):
+        values = sorted(self.recent)
+        if not values:
+            return {}
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in QUANTILES}
+
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_request_spans = contextvars.ContextVar('request_spans', default=None)
+
+
+def _series(labels):
+    return tuple(sorted(labels.items()))
+
+
+def observe(name, value, **labels):
+    """Add one observation to a histogram"""
+    with _lock:
+        histogram = _histograms.setdefault(name, {}).get(_series(labels))
+        if histogram is None:
+            histogram = _histograms[name][_series(labels)] = Histogram()
+        histogram.observe(value)
+
+
+def inc(name, amount=1, **labels):
+    """Increase a counter"""
+    with _lock:
+        series = _counters.setdefault(name, {})
+        key = _series(labels)
+        series[key] = series.get(key, 0) + amount
+
+
+@contextmanager
+def span(stage, model=None):
+    """Time a pipeline stage. The yielded dict's 'status' may be changed; errors set it to 'error'."""
+    labels = {'stage': stage, 'model': model or '', 'status': 'ok'}
+    started = time.perf_counter()
+    try:
+        yield labels
+    except BaseException:
+        labels['status'] = 'error'
+        raise
+    finally:
+        record_span(time.perf_counter() - started, **labels)
+
+
+def record_span(duration, stage, model=None, status='ok'):
+    """Record a stage timed by the caller, e.g. one that ends outside the request's code"""
+    observe('stage_duration_seconds', duration, stage=stage, model=model or '', status=status)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((stage, model, duration))
+
+
+def start_request():
+    """Collect the spans of the request being handled in this context"""
+    _request_spans.set([])
+
+
+def request_spans():
+    return _request_spans.get() or []
+
+
+_TOKEN_RE = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+
+def server_timing(spans, total=None):
+    """Server-Timing header value for a request's spans, in milliseconds"""
+    entries = []
+    for stage, model, duration in list(spans):
+        entry = _TOKEN_RE.sub('_', stage)
+        if model:
+            entry += f';desc="{model}"'
+        entries.append(f"{entry};dur={duration * 1000:.1f}")
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ', '.join(entries)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(series, **extra):
+    pairs = list(series) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def render_prometheus():
+    """Every metric in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        for name, series in sorted(_counters.items()):
+            metric = f"{METRICS_PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{metric}{_labels(key)} {value}")
+
+        for name, series in sorted(_histograms.items()):
+            metric = f"{METRICS_PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} histogram")
+            for key, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{_labels(key, le=bound)} {cumulative}")
+                lines.append(f"{metric}_bucket{_labels(key, le='+Inf')} {histogram.count}")
+                lines.append(f"{metric}_sum{_labels(key)} {histogram.sum}")
+                lines.append(f"{metric}_count{_labels(key)} {histogram.count}")
+
+            # Percentiles over the most recent observations of each series
+            lines.append(f"# HELP {metric}_recent {HELP.get(name, name)}, last {METRICS_WINDOW} observations")
+            lines.append(f"# TYPE {metric}_recent summary")
+            for key, histogram in sorted(series.items()):
+                for quantile, value in histogram.quantiles().items():
+                    lines.append(f"{metric}_recent{_labels(key, quantile=quantile)} {value}")
+                lines.append(f"{metric}_recent_sum{_labels(key)} {sum(histogram.recent)}")
+                lines.append(f"{metric}_recent_count{_labels(key)} {len(histogram.recent)}")
+    return '\n'.join(lines) + '\n'
+
+
+def get_stats():
+    """p50/p95/p99 in milliseconds for every pipeline stage, for /stats"""
+    stats = {}
+    with _lock:
+        for key, histogram in _histograms.get('stage_duration_seconds', {}).items():
+            labels = dict(key)
+            name = labels['stage'] + (f" {labels['model']}" if labels['model'] else '') + f" ({labels['status']})"
+            stats[name] = {
+                'count': histogram.count,
+                **{f"p{int(q * 100)}_ms": round(value * 1000, 2) for q, value in histogram.quantiles().items()},
+            }
+    return stats
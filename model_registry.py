@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import threading
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Optional JSON file replacing the default model list below
+REGISTRY_PATH = os.getenv('MODEL_REGISTRY_PATH')
+
+# Circuit breaker configuration
+BREAKER_WINDOW = int(os.getenv('MODEL_BREAKER_WINDOW', '20'))
+BREAKER_MIN_CALLS = int(os.getenv('MODEL_BREAKER_MIN_CALLS', '5'))
+BREAKER_ERROR_RATE = float(os.getenv('MODEL_BREAKER_ERROR_RATE', '0.5'))
+BREAKER_COOLDOWN = float(os.getenv('MODEL_BREAKER_COOLDOWN_SECONDS', '60'))
+
+TASKS = ('summarization', 'keywords', 'sentiment')
+
+DEFAULT_MODELS = [
+    {
+        'name': 'facebook/bart-large-cnn',
+        'task': 'summarization',
+        'timeout': 30,
+        'cost_weight': 3.0,
+        'max_input_tokens': 1024,
+    },
+    {
+        'name': 'yanekyuk/bert-uncased-keyword-extractor',
+        'task': 'keywords',
+        'timeout': 10,
+        'cost_weight': 1.0,
+        'max_input_tokens': 512,
+    },
+    {
+        'name': 'mrm8488/bert-tiny2-finetuned-keyword-extraction',
+        'task': 'keywords',
+        'timeout': 10,
+        'cost_weight': 0.5,
+        'max_input_tokens': 512,
+    },
+    {
+        'name': 'nlptown/bert-base-multilingual-uncased-sentiment',
+        'task': 'sentiment',
+        'timeout': 15,
+        'cost_weight': 1.0,
+        'max_input_tokens': 512,
+    },
+]
+
+
+@dataclass
+class ModelSpec:
+    name: str
+    task: str
+    # HuggingFace task type, selects the default request parameters
+    task_type: str = 'text-generation'
+    # Extra request parameters layered over the task type defaults
+    parameters: dict = field(default_factory=dict)
+    # Read timeout in seconds; a model slower than this on average is skipped
+    timeout: float = 30.0
+    cost_weight: float = 1.0
+    # Input window in model tokens; unset means CHUNK_TOKEN_BUDGET
+    max_input_tokens: int = None
+    enabled: bool = True
+
+
+class ModelHealth:
+    """Rolling latency/error window for one model with a circuit breaker.
+
+    The breaker opens when the error rate over the last ``BREAKER_WINDOW``
+    calls reaches ``BREAKER_ERROR_RATE``, or when calls are consistently
+    slower than the model's timeout. After ``BREAKER_COOLDOWN`` seconds a
+    single trial call is let through; its outcome closes or re-opens it.
+    """
+
+    def __init__(self, slow_threshold):
+        self.slow_threshold = slow_threshold
+        self.outcomes = deque(maxlen=BREAKER_WINDOW)
+        self.calls = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.opened_at = None
+        self.trial_started_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def trial_in_flight(self):
+        return self.trial_started_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < BREAKER_COOLDOWN:
+                return False
+            # A trial that never reported back (e.g. served from cache) expires too
+            if self.trial_in_flight and now - self.trial_started_at < BREAKER_COOLDOWN:
+                return False
+            self.trial_started_at = now
+            return True
+
+    def record(self, latency, ok):
+        with self._lock:
+            self.calls += 1
+            self.total_latency += latency
+            if not ok:
+                self.errors += 1
+            self.outcomes.append((ok, latency))
+
+            if self.trial_in_flight:
+                self.trial_started_at = None
+                if ok and latency <= self.slow_threshold:
+                    self.opened_at = None
+                    self.outcomes.clear()
+                else:
+                    self.opened_at = time.monotonic()
+                return
+
+            if self.opened_at is None and self._should_open():
+                self.opened_at = time.monotonic()
+                return True
+
+    def _should_open(self):
+        if len(self.outcomes) < BREAKER_MIN_CALLS:
+            return False
+        failures = sum(1 for ok, _ in self.outcomes if not ok)
+        if failures / len(self.outcomes) >= BREAKER_ERROR_RATE:
+            return True
+        latencies = sorted(latency for _, latency in self.outcomes)
+        return latencies[len(latencies) // 2] > self.slow_threshold
+
+    def snapshot(self):
+        with self._lock:
+            recent_errors = sum(1 for ok, _ in self.outcomes if not ok)
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'recent_error_rate': recent_errors / len(self.outcomes) if self.outcomes else 0.0,
+                'avg_latency': self.total_latency / self.calls if self.calls else 0.0,
+                'state': 'closed' if self.opened_at is None else ('half-open' if self.trial_in_flight else 'open'),
+            }
+
+
+def load_models(path=REGISTRY_PATH):
+    """Load model specs from JSON (or the defaults), dropping duplicates"""
+    if path:
+        with open(path) as f:
+            entries = json.load(f)
+        logger.info("Loaded %s model entries from %s", len(entries), path)
+    else:
+        entries = DEFAULT_MODELS
+
+    specs = {}
+    for entry in entries:
+        spec = ModelSpec(**entry)
+        if spec.task not in TASKS:
+            raise ValueError(f"Unknown task {spec.task} for model {spec.name}")
+        if spec.name in specs:
+            logger.warning("Ignoring duplicate registry entry for %s", spec.name)
+            continue
+        specs[spec.name] = spec
+    return specs
+
+
+_models = load_models()
+_health = {name: ModelHealth(spec.timeout) for name, spec in _models.items()}
+
+
+def get_model(model_name):
+    return _models.get(model_name)
+
+
+def enabled_models(task):
+    """Every enabled model for a task, whatever the state of its breaker"""
+    return [spec for spec in _models.values() if spec.task == task and spec.enabled]
+
+
+def cheapest(specs):
+    """The model with the lowest cost_weight, the first listed on a tie"""
+    return min(specs, key=lambda spec: spec.cost_weight) if specs else None
+
+
+def primary_model(task):
+    """The cheapest enabled model for a task, whatever the state of its breaker"""
+    return cheapest(enabled_models(task))
+
+
+def models_for(task, limit=None):
+    """Enabled models for a task whose circuit breaker lets calls through.
+
+    Only call this for models that are about to be used: a model whose
+    breaker is cooling down gets its trial call reserved here.
+    """
+    available = []
+    for spec in _models.values():
+        if limit is not None and len(available) >= limit:
+            break
+        if spec.task != task or not spec.enabled:
+            continue
+        if not _health[spec.name].allow():
+            logger.warning("Skipping %s: circuit open", spec.name)
+            continue
+        available.append(spec)
+    return available
+
+
+def record_result(model_name, latency, ok):
+    """Feed the outcome of one upstream call into the model's breaker"""
+    health = _health.get(model_name)
+    if health is None:
+        return
+    if health.record(latency, ok):
+        logger.warning("Circuit opened for %s for %ss", model_name, BREAKER_COOLDOWN)
+
+
+def get_stats():
+    return {
+        name: {
+            'task': spec.task,
+            'enabled': spec.enabled,
+            'cost_weight': spec.cost_weight,
+            'timeout': spec.timeout,
+            **_health[name].snapshot(),
+        }
+        for name, spec in _models.items()
+    }
@@ -0,0 +1,495 @@
+"""PDF analysis reports, rendered in a pool of worker processes.
+
+ReportLab layout is CPU bound and holds the GIL, so rendering on the
+request thread stalls every other request in the process. Reports are
+rendered in separate processes instead. At most ``PDF_MAX_QUEUE`` renders
+may be running or waiting at once, and identical payloads are served from
+a cache of the rendered bytes.
+"""
+import io
+import os
+import re
+import json
+import tempfile
+import shutil
+import zipfile
+import hashlib
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+
+from pypdf import PdfReader, PdfWriter
+
+from inference_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# PDF rendering configuration; PDF_WORKERS=0 renders on the calling thread
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', str(os.cpu_count() or 1)))
+PDF_MAX_QUEUE = int(os.getenv('PDF_MAX_QUEUE', str(max(1, PDF_WORKERS) * 4)))
+PDF_QUEUE_TIMEOUT = float(os.getenv('PDF_QUEUE_TIMEOUT_SECONDS', '5'))
+PDF_RENDER_TIMEOUT = float(os.getenv('PDF_RENDER_TIMEOUT_SECONDS', '60'))
+PDF_CACHE_MAX_ENTRIES = int(os.getenv('PDF_CACHE_MAX_ENTRIES', '256'))
+PDF_CACHE_TTL = float(os.getenv('PDF_CACHE_TTL_SECONDS', '3600'))
+PDF_BULK_MAX_REPORTS = int(os.getenv('PDF_BULK_MAX_REPORTS', '1000'))
+
+LINKEDIN_BLUE = colors.HexColor('#0077B5')
+
+# Styles are immutable once built, so every report shares them
+STYLES = getSampleStyleSheet()
+
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=STYLES['Heading1'],
+    fontSize=24,
+    spaceAfter=30,
+    textColor=LINKEDIN_BLUE
+)
+
+HEADING_STYLE = ParagraphStyle(
+    'CustomHeading',
+    parent=STYLES['Heading2'],
+    fontSize=16,
+    spaceAfter=12,
+    textColor=LINKEDIN_BLUE
+)
+
+DATE_STYLE = ParagraphStyle(
+    'Date',
+    parent=STYLES['Normal'],
+    fontSize=10,
+    textColor=colors.gray
+)
+
+SCORE_STYLE = ParagraphStyle(
+    'Score',
+    parent=STYLES['Heading2'],
+    fontSize=36,
+    textColor=LINKEDIN_BLUE,
+    alignment=1  # Center alignment
+)
+
+TOC_STYLE = ParagraphStyle('TOCEntry', parent=STYLES['Normal'], fontSize=11, leading=16)
+TOC_PAGE_STYLE = ParagraphStyle('TOCPage', parent=TOC_STYLE, alignment=2)  # Right alignment
+
+
+def _list_table_style(background, text, grid):
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor(background)),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor(text)),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ('TOPPADDING', (0, 0), (-1, -1), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor(grid)),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ])
+
+
+# Report sections in order: (heading, analysis field, table style)
+SECTIONS = [
+    ("Key Strengths", 'strengths', _list_table_style('#E1F0FA', '#0077B5', '#0077B5')),
+    ("Areas for Improvement", 'improvements', _list_table_style('#FFF5F5', '#DC3545', '#DC3545')),
+    ("Suggested Keywords", 'keywords', _list_table_style('#F8F9FA', '#212529', '#DEE2E6')),
+    ("Detailed Suggestions", 'suggestions', _list_table_style('#F8F9FA', '#212529', '#DEE2E6')),
+]
+REPORT_FIELDS = ('score', *(field for _, field, _ in SECTIONS))
+
+
+def render_date():
+    """Date printed on a report; it is part of the report's cache key"""
+    return datetime.now().strftime('%B %d, %Y')
+
+
+def report_elements(analysis_data, title=None, generated_on=None):
+    """ReportLab flowables for one analysis report.
+
+    Titles and items may hold user text, which is escaped before it goes
+    into Paragraph markup.
+    """
+    title = title or "LinkedIn Profile Analysis Report"
+    elements = []
+
+    # Title
+    elements.append(Paragraph(escape(title), TITLE_STYLE))
+    elements.append(Spacer(1, 20))
+
+    # Date
+    elements.append(Paragraph(f"Generated on: {generated_on or render_date()}", DATE_STYLE))
+    elements.append(Spacer(1, 30))
+
+    # Profile Score
+    elements.append(Paragraph(f"Profile Score: {analysis_data['score']}%", SCORE_STYLE))
+    elements.append(Spacer(1, 30))
+
+    for index, (heading, field, table_style) in enumerate(SECTIONS):
+        elements.append(Paragraph(heading, HEADING_STYLE))
+        rows = [[Paragraph(escape(str(item)), STYLES['Normal'])] for item in analysis_data[field]]
+        if rows:
+            table = Table(rows, colWidths=[6*inch])
+            table.setStyle(table_style)
+            elements.append(table)
+        else:
+            # ReportLab cannot lay out a table without rows
+            elements.append(Paragraph("None", STYLES['Normal']))
+        if index < len(SECTIONS) - 1:
+            elements.append(Spacer(1, 20))
+
+    return elements
+
+
+def build_report(analysis_data, title=None, generated_on=None):
+    """Render a beautiful PDF report from the analysis data and return its bytes"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72)
+    doc.build(report_elements(analysis_data, title, generated_on))
+    return buffer.getvalue()
+
+
+def missing_fields(analysis_data):
+    """Analysis fields a report needs that analysis_data lacks"""
+    return [field for field in REPORT_FIELDS if field not in analysis_data]
+
+
+def report_label(analysis_data, index):
+    """Name of a report within a bulk export"""
+    label = analysis_data.get('name') or analysis_data.get('id')
+    return str(label) if label is not None else f"Profile {index + 1}"
+
+
+def build_contents(entries):
+    """PDF bytes of the title page and table of contents for (title, first page) entries"""
+    buffer = io.BytesIO()
+    rows = [[Paragraph(escape(title), TOC_STYLE), Paragraph(str(page), TOC_PAGE_STYLE)] for title, page in entries]
+    elements = [
+        Paragraph("LinkedIn Profile Analysis Reports", HEADING_STYLE),
+        Paragraph(f"{len(entries)} reports, generated on {datetime.now().strftime('%B %d, %Y %H:%M')}", DATE_STYLE),
+        Spacer(1, 20),
+    ]
+    if rows:
+        elements.append(Table(rows, colWidths=[5.5*inch, 0.5*inch]))
+    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72)
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def _page_count(path):
+    with open(path, 'rb') as f:
+        return len(PdfReader(f).pages)
+
+
+def assemble_combined_report(titles, report_paths, path):
+    """Write a table of contents followed by the rendered reports (PDF files) to path.
+
+    Each report also gets a bookmark. The contents pages shift every page
+    number after them, so they are laid out again until their length settles.
+    Only one report file is open at a time.
+    """
+    page_counts = [_page_count(report_path) for report_path in report_paths]
+    contents_pages = 1
+    for _ in range(5):
+        entries = []
+        page = contents_pages + 1
+        for title, pages in zip(titles, page_counts):
+            entries.append((title, page))
+            page += pages
+        contents = PdfReader(io.BytesIO(build_contents(entries)))
+        if len(contents.pages) == contents_pages:
+            break
+        contents_pages = len(contents.pages)
+
+    writer = PdfWriter()
+    writer.append(contents)
+    for title, report_path in zip(titles, report_paths):
+        with open(report_path, 'rb') as f:
+            writer.append(f, outline_item=title)
+    with open(path, 'wb') as f:
+        writer.write(f)
+    return path
+
+
+class RenderQueueFull(Exception):
+    """Raised when too many reports are already waiting to be rendered"""
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PDF_MAX_QUEUE)
+_in_flight = {}
+_cache = LRUCache(PDF_CACHE_MAX_ENTRIES, PDF_CACHE_TTL)
+
+_stats_lock = threading.Lock()
+_stats = {'renders': 0, 'cache_hits': 0, 'shared_renders': 0, 'rejected': 0, 'errors': 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A pool inherited over fork has no live workers, start a new one per process
+        if _pool is None or _pool_pid != os.getpid():
+            # Spawned workers do not inherit the server's threads and locks
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def warm_up():
+    """Start the worker processes now rather than on the first report request"""
+    if PDF_WORKERS > 0:
+        # Each queued task without an idle worker spawns one; every worker imports ReportLab and builds the styles
+        pool = _get_pool()
+        wait([pool.submit(os.getpid) for _ in range(PDF_WORKERS)])
+
+
+def shutdown():
+    """Stop the worker processes of this server process"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+def _discard_pool():
+    global _pool
+    # A worker died mid-render; the pool refuses all work after that
+    logger.error("PDF worker pool broke, starting a new one for the next report")
+    with _pool_lock:
+        _pool = None
+
+
+def report_key(analysis_data, title=None, generated_on=None):
+    """Content hash of an analysis payload, the report title and the date printed on it"""
+    material = json.dumps([analysis_data, title, generated_on], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def _submit(fn, *args, queue_timeout=PDF_QUEUE_TIMEOUT):
+    """Run fn in a worker process once a queue slot is free"""
+    if not _slots.acquire(timeout=queue_timeout):
+        _count('rejected')
+        raise RenderQueueFull(f"{PDF_MAX_QUEUE} reports are already being rendered")
+    try:
+        rendered = _get_pool().submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    rendered.add_done_callback(lambda _: _slots.release())
+    return rendered
+
+
+def render(analysis_data):
+    """PDF bytes for an analysis, from the cache or a worker process.
+
+    Concurrent requests for the same payload share one render. Raises
+    RenderQueueFull when no render slot frees up within
+    ``PDF_QUEUE_TIMEOUT`` seconds.
+    """
+    # A cached report is only reused on the day it says it was generated
+    generated_on = render_date()
+    key = report_key(analysis_data, generated_on=generated_on)
+    cached = _cache.get(key)
+    if cached is not None:
+        _count('cache_hits')
+        return cached
+
+    with _pool_lock:
+        shared = _in_flight.get(key)
+        if shared is None:
+            future = _in_flight[key] = Future()
+    if shared is not None:
+        _count('shared_renders')
+        return shared.result(timeout=PDF_RENDER_TIMEOUT)
+
+    try:
+        _count('renders')
+        if PDF_WORKERS <= 0:
+            pdf = build_report(analysis_data, None, generated_on)
+        else:
+            pdf = _submit(build_report, analysis_data, None, generated_on).result(timeout=PDF_RENDER_TIMEOUT)
+    except BaseException as e:
+        _count('errors')
+        if isinstance(e, BrokenProcessPool):
+            _discard_pool()
+        future.set_exception(e)
+        raise
+    else:
+        _cache.set(key, None, pdf)
+        future.set_result(pdf)
+        return pdf
+    finally:
+        with _pool_lock:
+            _in_flight.pop(key, None)
+
+
+def _render_later(analysis_data, title=None):
+    """Future for the PDF bytes of one report in a bulk export"""
+    generated_on = render_date()
+    key = report_key(analysis_data, title, generated_on)
+    cached = _cache.get(key)
+    if cached is not None:
+        _count('cache_hits')
+    if cached is not None or PDF_WORKERS <= 0:
+        future = Future()
+        try:
+            future.set_result(cached if cached is not None else build_report(analysis_data, title, generated_on))
+        except Exception as e:
+            future.set_exception(e)
+        return key, future
+    # Bulk exports wait their turn for a slot rather than being turned away
+    _count('renders')
+    return key, _submit(build_report, analysis_data, title, generated_on, queue_timeout=PDF_RENDER_TIMEOUT)
+
+
+def render_many(analyses, window=None, titles=None):
+    """Render reports in parallel, yielding (index, pdf bytes, error) as each finishes.
+
+    At most ``window`` reports (by default one per worker) are rendering
+    at a time, which leaves room in the queue for single reports.
+    ``titles`` optionally replaces the title of each report.
+    """
+    window = window or max(1, PDF_WORKERS)
+    analyses = iter(enumerate(analyses))
+    running = {}
+    more = True
+    try:
+        while True:
+            while more and len(running) < window:
+                item = next(analyses, None)
+                if item is None:
+                    more = False
+                    break
+                index, analysis_data = item
+                try:
+                    key, future = _render_later(analysis_data, titles[index] if titles else None)
+                except RenderQueueFull as e:
+                    key, future = None, Future()
+                    future.set_exception(e)
+                running[future] = (index, key)
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, key = running.pop(future)
+                try:
+                    pdf = future.result()
+                except Exception as e:
+                    _count('errors')
+                    if isinstance(e, BrokenProcessPool):
+                        _discard_pool()
+                    logger.error("Rendering report %s failed: %s", index, e)
+                    yield index, None, e
+                    continue
+                _cache.set(key, None, pdf)
+                yield index, pdf, None
+    finally:
+        for future in running:
+            future.cancel()
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable file that hands whatever was written to the next read"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _file_name(analysis_data, index):
+    slug = re.sub(r'[^A-Za-z0-9._-]+', '_', report_label(analysis_data, index)).strip('_') or 'report'
+    return f"{index + 1:04d}_{slug[:80]}"
+
+
+def stream_zip(analyses):
+    """ZIP archive of one PDF per analysis, yielded in chunks as each report finishes.
+
+    Only the report being added is held in memory. A report that fails to
+    render is replaced by a text file with the error.
+    """
+    writer = _ChunkWriter()
+    # PDFs are already compressed, so the archive only stores them
+    with zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for index, pdf, error in render_many(analyses):
+            name = _file_name(analyses[index], index)
+            if error is None:
+                archive.writestr(f"{name}.pdf", pdf)
+            else:
+                archive.writestr(f"{name}.error.txt", f"Could not render this report: {str(error)}\n")
+            yield writer.drain()
+    yield writer.drain()
+
+
+def render_combined(analyses):
+    """Path of a temporary PDF holding every analysis after a table of contents.
+
+    The reports are rendered in parallel like a ZIP export. Each is written
+    to its own temporary file as it finishes, so no more than a window of
+    reports is held in memory, and the files are put together in one worker
+    process. The caller deletes the returned file once it has been sent.
+    """
+    titles = [f"{index + 1}. {report_label(analysis_data, index)}" for index, analysis_data in enumerate(analyses)]
+    workdir = tempfile.mkdtemp(prefix='profile-reports-')
+    report_paths = [os.path.join(workdir, f"{index:06d}.pdf") for index in range(len(analyses))]
+    handle, path = tempfile.mkstemp(prefix='profile-reports-', suffix='.pdf')
+    os.close(handle)
+    try:
+        for index, pdf, error in render_many(analyses, titles=titles):
+            if error is not None:
+                raise error
+            with open(report_paths[index], 'wb') as f:
+                f.write(pdf)
+
+        try:
+            if PDF_WORKERS <= 0:
+                assemble_combined_report(titles, report_paths, path)
+            else:
+                _submit(assemble_combined_report, titles, report_paths, path, queue_timeout=PDF_RENDER_TIMEOUT).result()
+        except BaseException as e:
+            _count('errors')
+            if isinstance(e, BrokenProcessPool):
+                _discard_pool()
+            raise
+    except BaseException:
+        os.remove(path)
+        raise
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return path
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['workers'] = PDF_WORKERS
+    stats['max_queue'] = PDF_MAX_QUEUE
+    stats['cached_reports'] = len(_cache)
+    return stats
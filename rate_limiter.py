@@ -0,0 +1,339 @@
+"""Upstream request quota shared by every worker process.
+
+All analyses send their model calls with the same API key, so they share
+one rate limit upstream. Every upstream request first takes a token from a
+bucket kept in SQLite, which all workers on the host use.
+
+The quota is not configured up front but learned. Until the first 429
+there is no limit. Each 429 cuts the rate to half of what was being sent,
+empties the bucket and holds calls back for the ``Retry-After`` time. After
+that the rate creeps back up until the next 429.
+
+When tokens run short, calls are served by priority. Interactive
+requests may take the last token. Background jobs and bulk analyses must
+leave ``RATE_LIMIT_RESERVE`` of the bucket to them, and the redundant
+keyword models twice that. These optional calls are dropped rather than
+kept waiting, so summary and sentiment calls keep getting through.
+"""
+import os
+import math
+import time
+import sqlite3
+import threading
+import contextvars
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Rate limit configuration
+RATE_LIMIT_DB_PATH = os.getenv('RATE_LIMIT_DB', 'rate_limit.db')
+# Known quota in requests per second, 0 to learn it from 429 responses alone
+RATE_LIMIT_PER_SECOND = float(os.getenv('RATE_LIMIT_PER_SECOND', '0'))
+RATE_LIMIT_MIN_PER_SECOND = float(os.getenv('RATE_LIMIT_MIN_PER_SECOND', '0.2'))
+# How fast a learned rate grows back, in requests per second per second
+RATE_LIMIT_RECOVERY = float(os.getenv('RATE_LIMIT_RECOVERY', '0.2'))
+RATE_LIMIT_BURST = float(os.getenv('RATE_LIMIT_BURST', '10'))
+# Share of the bucket each lower priority level leaves to the one above it
+RATE_LIMIT_RESERVE = float(os.getenv('RATE_LIMIT_RESERVE', '0.25'))
+RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT_SECONDS', '10'))
+# Time over which the rate being sent is averaged
+RATE_WINDOW = 1.0
+# Further 429s within this long of a rate cut are part of the same burst and do not cut it again
+CUT_HOLD = 2.0
+# Longest sleep between two attempts to take a token
+POLL_INTERVAL = 0.5
+# How long a process acts on the bucket it last read while no quota is known
+SYNC_INTERVAL = 0.1
+
+BUCKET = 'upstream'
+
+_batch = contextvars.ContextVar('rate_limit_batch', default=False)
+_optional = contextvars.ContextVar('rate_limit_optional', default=False)
+
+
+class RateLimited(Exception):
+    """Raised when an upstream call gets no token in time, or is dropped as optional"""
+
+
+@contextmanager
+def priority(batch=None, optional=None):
+    """Mark the upstream calls made within, including from submitted tasks.
+
+    ``batch`` calls are background work; ``optional`` calls are redundant
+    and are dropped first.
+    """
+    tokens = []
+    if batch is not None:
+        tokens.append((_batch, _batch.set(batch)))
+    if optional is not None:
+        tokens.append((_optional, _optional.set(optional)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def is_batch():
+    """Whether the calls made here are background work"""
+    return _batch.get()
+
+
+def current_level():
+    """0 for interactive calls, one more for batch work and one more for optional calls"""
+    return int(_batch.get()) + int(_optional.get())
+
+
+def reserve_for(level):
+    return level * RATE_LIMIT_RESERVE * RATE_LIMIT_BURST
+
+
+class TokenBucket:
+    """The shared token bucket, one row in a SQLite file.
+
+    Every change happens in an immediate transaction, so workers in other
+    processes see a consistent bucket. ``rate`` is NULL while no quota is
+    known. ``observed`` is the rate of granted requests, decayed over
+    RATE_WINDOW seconds.
+
+    While no quota is known, calls are let through on the last state read,
+    for up to SYNC_INTERVAL seconds. They are counted in the process and
+    added to ``observed`` at the next write.
+    """
+
+    def __init__(self, path, name=BUCKET):
+        self.path = path
+        self.name = name
+        # One connection per process, which its threads take turns on. Waiting
+        # here is cheaper than in SQLite's busy handler, which sleeps.
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._known = None
+        self._known_at = 0.0
+        self._unsynced = 0
+        os.register_at_fork(after_in_child=self._forked)
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            'name TEXT PRIMARY KEY, tokens REAL NOT NULL, rate REAL, observed REAL NOT NULL, '
+            'blocked_until REAL NOT NULL, cut_at REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+        conn.execute(
+            'INSERT OR IGNORE INTO buckets VALUES (?, ?, ?, 0, 0, 0, ?)',
+            (name, RATE_LIMIT_BURST, RATE_LIMIT_PER_SECOND or None, time.time())
+        )
+
+    def _forked(self):
+        # The lock may have been held by a thread that does not exist in the child,
+        # and the parent's unwritten calls are its own to write
+        self._lock = threading.Lock()
+        self._known = None
+        self._unsynced = 0
+
+    def _connect(self):
+        # A connection must not be shared with forked processes; call with the lock held
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            # Losing the last few updates in a power cut is fine for a rate limit
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._pid = os.getpid()
+        return self._conn
+
+    def _fresh(self, now):
+        """The last state read, if it is recent enough to act on"""
+        if self._known is not None and now - self._known_at < SYNC_INTERVAL:
+            return self._known
+        return None
+
+    def _update(self, change):
+        """Refill the bucket to now, apply change(state, now) and save the result"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT tokens, rate, observed, blocked_until, cut_at, updated_at FROM buckets WHERE name = ?',
+                (self.name,)
+            ).fetchone()
+            now = time.time()
+            state = self._refill(dict(zip(('tokens', 'rate', 'observed', 'blocked_until', 'cut_at'), row)), row[5], now)
+            state['observed'] += self._unsynced / RATE_WINDOW
+            result = change(state, now)
+            conn.execute(
+                'UPDATE buckets SET tokens = ?, rate = ?, observed = ?, blocked_until = ?, cut_at = ?, updated_at = ? '
+                'WHERE name = ?',
+                (state['tokens'], state['rate'], state['observed'], state['blocked_until'], state['cut_at'], now, self.name)
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self._unsynced = 0
+        self._known, self._known_at = state, now
+        return result
+
+    @staticmethod
+    def _refill(state, updated_at, now):
+        elapsed = max(0.0, now - updated_at)
+        state['observed'] *= math.exp(-elapsed / RATE_WINDOW)
+        rate = state['rate']
+        if rate is not None:
+            rate += RATE_LIMIT_RECOVERY * elapsed
+            if RATE_LIMIT_PER_SECOND:
+                rate = min(rate, RATE_LIMIT_PER_SECOND)
+            state['rate'] = rate
+            state['tokens'] = min(RATE_LIMIT_BURST, state['tokens'] + rate * elapsed)
+        return state
+
+    def take(self, level):
+        """Take a token for a call of the given level, returning 0 or the seconds to wait first"""
+        def change(state, now):
+            if state['blocked_until'] > now:
+                return state['blocked_until'] - now
+            if state['rate'] is not None:
+                needed = 1 + reserve_for(level)
+                if state['tokens'] < needed:
+                    return (needed - state['tokens']) / state['rate']
+                state['tokens'] -= 1
+            state['observed'] += 1 / RATE_WINDOW
+            return 0
+
+        with self._lock:
+            now = time.time()
+            known = self._fresh(now)
+            if known is not None and known['rate'] is None and known['blocked_until'] <= now:
+                self._unsynced += 1
+                return 0
+            return self._update(change)
+
+    def throttled(self, retry_after):
+        """Learn from a 429: cut the rate below what was being sent and hold calls back.
+
+        Returns the new rate, or None if the rate was just cut for the same burst.
+        """
+        def change(state, now):
+            state['tokens'] = 0.0
+            state['blocked_until'] = max(state['blocked_until'], now + retry_after)
+            if now - state['cut_at'] < CUT_HOLD:
+                return None
+            sent = state['observed'] if state['rate'] is None else min(state['rate'], state['observed'])
+            state['rate'] = max(RATE_LIMIT_MIN_PER_SECOND, sent / 2)
+            state['cut_at'] = now
+            return state['rate']
+
+        with self._lock:
+            return self._update(change)
+
+    def state(self):
+        """Current tokens and rates, as of at most SYNC_INTERVAL seconds ago"""
+        with self._lock:
+            now = time.time()
+            known = self._fresh(now)
+            if known is None:
+                row = self._connect().execute(
+                    'SELECT tokens, rate, observed, blocked_until, cut_at, updated_at FROM buckets WHERE name = ?',
+                    (self.name,)
+                ).fetchone()
+                known = self._refill(dict(zip(('tokens', 'rate', 'observed', 'blocked_until', 'cut_at'), row)), row[5], now)
+                self._known, self._known_at = known, now
+            return dict(known), now
+
+
+_bucket = TokenBucket(RATE_LIMIT_DB_PATH)
+
+_stats_lock = threading.Lock()
+_stats = {'granted': 0, 'waited': 0, 'wait_seconds': 0.0, 'dropped': 0, 'throttled': 0, 'shed': 0, 'errors': 0}
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def acquire(waiting=None):
+    """Wait for a token for one upstream request, or raise RateLimited.
+
+    Optional calls do not wait at all; the others wait up to
+    RATE_LIMIT_MAX_WAIT seconds, within the ``waiting()`` context manager
+    if one is given. If the bucket cannot be read the call is let through.
+    """
+    level = current_level()
+    give_up = time.monotonic() + (0 if _optional.get() else RATE_LIMIT_MAX_WAIT)
+    started = time.monotonic()
+    while True:
+        try:
+            wait = _bucket.take(level)
+        except sqlite3.Error as e:
+            _count('errors')
+            logger.error("Reading the rate limit failed: %s", e)
+            wait = 0
+        if not wait:
+            break
+        remaining = give_up - time.monotonic()
+        if remaining <= 0:
+            _count('dropped')
+            raise RateLimited(f"No upstream quota left for priority level {level}")
+        if waiting is None:
+            time.sleep(min(wait, remaining, POLL_INTERVAL))
+        else:
+            with waiting():
+                time.sleep(min(wait, remaining, POLL_INTERVAL))
+
+    _count('granted')
+    waited = time.monotonic() - started
+    if waited > 0.001:
+        _count('waited')
+        _count('wait_seconds', waited)
+
+
+def throttled(retry_after=None):
+    """Record a 429 response; ``retry_after`` is its Retry-After header, if any"""
+    _count('throttled')
+    try:
+        hold = float(retry_after) if retry_after else 0.0
+    except ValueError:
+        hold = 0.0
+    try:
+        rate = _bucket.throttled(hold)
+    except sqlite3.Error as e:
+        _count('errors')
+        logger.error("Updating the rate limit failed: %s", e)
+        return
+    if rate is not None:
+        logger.warning("Upstream rate limited, sending at most %.2f requests per second", rate)
+
+
+def under_pressure():
+    """Whether optional interactive calls would have to wait for a token now"""
+    try:
+        state, now = _bucket.state()
+    except sqlite3.Error as e:
+        _count('errors')
+        logger.error("Reading the rate limit failed: %s", e)
+        return False
+    if state['blocked_until'] > now:
+        return True
+    return state['rate'] is not None and state['tokens'] < 1 + reserve_for(1)
+
+
+def shed(count):
+    """Record optional calls skipped because of under_pressure()"""
+    _count('shed', count)
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    try:
+        state, now = _bucket.state()
+    except sqlite3.Error:
+        return stats
+    stats.update({
+        'rate_per_second': state['rate'],
+        'sent_per_second': round(state['observed'], 3),
+        'tokens': round(state['tokens'], 2) if state['rate'] is not None else None,
+        'blocked_for_seconds': round(max(0.0, state['blocked_until'] - now), 2),
+    })
+    return stats
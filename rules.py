@@ -0,0 +1,293 @@
+"""Keyword rules behind the strengths, improvements and suggestions.
+
+The rules are plain data, compiled once at import: every term they mention
+goes into a single trie-shaped regex and each rule set becomes one
+function. A profile is scanned once and each rule is then a set lookup
+against the terms that were found.
+"""
+import os
+import re
+import functools
+
+SECTIONS = ('headline', 'summary', 'experience', 'skills', 'education')
+
+# Distinct words whose matched terms are remembered between profiles
+TOKEN_CACHE_SIZE = int(os.getenv('RULES_TOKEN_CACHE_SIZE', '65536'))
+
+
+# Rule conditions. Term checks look at the whole profile unless scope='summary'.
+def has(*terms, scope='profile'):
+    return ('has', scope, terms)
+
+
+def lacks(*terms, scope='profile'):
+    return ('lacks', scope, terms)
+
+
+def shorter(section, length):
+    return ('shorter', section, length)
+
+
+def longer(section, length):
+    return ('longer', section, length)
+
+
+def either(*conditions):
+    return ('either', conditions)
+
+
+def few_keywords(count):
+    return ('few_keywords', count)
+
+
+def sentiment_below(score):
+    return ('sentiment_below', score)
+
+
+def sentiment_above(score):
+    return ('sentiment_above', score)
+
+
+# Each rule is (message, conditions); it fires when all its conditions hold
+STRENGTH_RULES = [
+    # Professional strengths
+    ("Strong leadership and management experience", [has('leadership', 'manage', 'direct')]),
+    ("Project and program management expertise", [has('project', 'program')]),
+    ("Technical proficiency and development skills", [has('technical', 'develop', 'engineer')]),
+    ("Innovative and creative problem-solving abilities", [has('innov', 'creativ')]),
+    ("Strong communication and presentation skills", [has('communicat', 'present')]),
+    ("Team collaboration and interpersonal skills", [has('team', 'collaborat')]),
+    ("Analytical and research capabilities", [has('analyt', 'research')]),
+    ("Strategic planning and execution", [has('strateg', 'plan')]),
+    # Education-based strengths
+    ("Strong educational background", [has('degree', 'bachelor', 'master', 'phd')]),
+    ("Professional certifications and qualifications", [has('certification', 'certified')]),
+    # Experience-based strengths
+    ("Comprehensive work experience", [has('experience'), longer('experience', 100)]),
+    ("Track record of achievements and results", [has('achievement', 'result')]),
+    # Sentiment-based strengths
+    ("Strong positive and confident tone", [sentiment_above(4)]),
+]
+
+IMPROVEMENT_RULES = [
+    # Identify areas for improvement
+    ("Consider adding relevant professional certifications", [lacks('certification', 'certified')]),
+    ("Include volunteer work or community involvement", [lacks('volunteer', 'community')]),
+    ("Add mentoring or teaching experience", [lacks('mentor', 'teach')]),
+    ("Include more quantifiable achievements and results", [lacks('achievement', 'result')]),
+    ("Add more specific skills and areas of expertise", [lacks('skill', 'expertise')]),
+    ("Highlight your professional network and connections", [lacks('network', 'connect')]),
+    ("Add your career goals and objectives", [lacks('goal', 'objective')]),
+    # Section-specific improvements
+    ("Make your headline more descriptive and impactful", [shorter('headline', 10)]),
+    ("Add more detail to your work experience section", [shorter('experience', 100)]),
+    ("Expand your skills section with more specific competencies", [shorter('skills', 50)]),
+    ("Expand your education section with more relevant details", [shorter('education', 50)]),
+    # Sentiment-based improvements
+    ("Consider using more positive and confident language", [sentiment_below(3)]),
+]
+
+SUGGESTION_RULES = [
+    # Content suggestions
+    ("Expand your professional summary to be more comprehensive", [shorter('summary', 200)]),
+    ("Include more industry-specific keywords in your profile", [few_keywords(5)]),
+    ("Add more quantifiable achievements to your experience", [lacks('achievement', 'result', scope='summary')]),
+    # Formatting suggestions
+    ("Make your headline more descriptive and impactful", [shorter('headline', 10)]),
+    ("Add more detail to your work experience section", [shorter('experience', 100)]),
+    ("Expand your skills section with more specific competencies", [shorter('skills', 50)]),
+    # Content quality suggestions
+    ("Consider adding data analytics experience if relevant",
+     [has('data', scope='summary'), lacks('analytics', scope='summary')]),
+    ("Specify cloud platforms you're familiar with",
+     [has('cloud', scope='summary'), lacks('aws', 'azure', scope='summary')]),
+    ("Mention specific agile methodologies you've used",
+     [has('agile', scope='summary'), lacks('scrum', scope='summary')]),
+    # Industry-specific suggestions
+    ("Include specific programming languages and frameworks", [has('tech', 'software', scope='summary')]),
+    ("Add metrics about sales performance or market impact", [has('market', 'sales', scope='summary')]),
+    ("Mention financial software or tools you're familiar with", [has('finance', 'account', scope='summary')]),
+    # Professional development suggestions
+    ("Consider adding relevant professional certifications", [lacks('certification', scope='summary')]),
+    ("Expand your education section with relevant details",
+     [either(lacks('education', scope='summary'), shorter('education', 50))]),
+]
+
+# Profile score: a section at least `length` characters long earns all its
+# `points`, a shorter one a proportional share. Each strength adds and each
+# improvement deducts FINDING_POINTS, up to MAX_FINDING_POINTS either way.
+SCORE_REQUIREMENTS = {
+    'headline': {'length': 10, 'points': 20},
+    'summary': {'length': 200, 'points': 25},
+    'experience': {'length': 100, 'points': 25},
+    'skills': {'length': 50, 'points': 20},
+    'education': {'length': 50, 'points': 10}
+}
+FINDING_POINTS = 2
+MAX_FINDING_POINTS = 10
+MAX_SCORE = 100
+
+
+def _collect_terms(conditions, terms):
+    for condition in conditions:
+        if condition[0] in ('has', 'lacks'):
+            terms.update(condition[2])
+        elif condition[0] == 'either':
+            _collect_terms(condition[1], terms)
+    return terms
+
+
+def _trie_pattern(terms):
+    """Regex alternation factored into a trie, preferring the longest term"""
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
+
+
+def _compile_terms(rule_sets):
+    terms = set()
+    for rules in rule_sets:
+        for _, conditions in rules:
+            _collect_terms(conditions, terms)
+    if any(char.isspace() for term in terms for char in term):
+        raise ValueError("Rule terms must not contain whitespace")
+
+    # The regex finds non-overlapping, longest-first matches. Terms hidden
+    # inside a match are recovered through `contained`; terms that would
+    # start inside a match but run past its end are listed in `overlapping`
+    # and checked directly.
+    pattern = re.compile(_trie_pattern(terms))
+    contained = {term: frozenset(other for other in terms if other in term) for term in terms}
+    overlapping = {
+        term: frozenset(
+            other for other in terms
+            if other not in contained[term]
+            and any(other.startswith(term[i:]) for i in range(1, len(term)))
+        )
+        for term in terms
+    }
+    return pattern, contained, overlapping
+
+
+_PATTERN, _CONTAINED, _OVERLAPPING = _compile_terms([STRENGTH_RULES, IMPROVEMENT_RULES, SUGGESTION_RULES])
+_NO_TERMS = frozenset()
+
+
+@functools.lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _token_terms(token):
+    """Rule terms occurring inside one whitespace-free token"""
+    matched = _PATTERN.findall(token)
+    if not matched:
+        return _NO_TERMS
+    found = set()
+    for term in matched:
+        found |= _CONTAINED[term]
+    for term in matched:
+        for other in _OVERLAPPING[term]:
+            if other not in found and other in token:
+                found.add(other)
+    return frozenset(found)
+
+
+class ProfileScan:
+    """Terms found in a profile, overall and within the summary section"""
+
+    def __init__(self, profile_terms, summary_terms):
+        self.terms = {'profile': profile_terms, 'summary': summary_terms}
+
+
+def scan_profile(profile):
+    """Find every rule term in the profile in one pass over its words.
+
+    No term contains whitespace, so a term occurs in the text exactly when
+    it occurs inside one of its whitespace-separated tokens. Each distinct
+    token is matched once and remembered, which makes repeated vocabulary
+    (long sections, bulk scoring) nearly free.
+    """
+    summary = profile['summary'].lower()
+    rest = ' '.join(profile[section].lower() for section in SECTIONS if section != 'summary')
+
+    summary_terms = _NO_TERMS.union(*map(_token_terms, set(summary.split())))
+    profile_terms = summary_terms.union(*map(_token_terms, set(rest.split())))
+    return ProfileScan(profile_terms, summary_terms)
+
+
+def _condition_source(condition, constants):
+    """Python expression for a rule condition; term sets go into constants"""
+    kind = condition[0]
+    if kind in ('has', 'lacks'):
+        _, scope, terms = condition
+        name = f"_terms{len(constants)}"
+        constants[name] = frozenset(terms)
+        test = f"{scope}_terms.isdisjoint({name})"
+        return f"not {test}" if kind == 'has' else test
+    elif kind == 'shorter':
+        _, section, length = condition
+        return f"len(profile[{section!r}]) < {length!r}"
+    elif kind == 'longer':
+        _, section, length = condition
+        return f"len(profile[{section!r}]) > {length!r}"
+    elif kind == 'either':
+        return '(' + ' or '.join(_condition_source(option, constants) for option in condition[1]) + ')'
+    elif kind == 'few_keywords':
+        return f"len(keywords) < {condition[1]!r}"
+    elif kind == 'sentiment_below':
+        return f"sentiment_score < {condition[1]!r}"
+    elif kind == 'sentiment_above':
+        return f"sentiment_score > {condition[1]!r}"
+    raise ValueError(f"Unknown rule condition {kind}")
+
+
+def _compile_rules(rules):
+    """Compile rules into one straight-line function returning the fired messages.
+
+    Checking a few dozen rules per profile is cheap enough that the cost of
+    calling a predicate per condition dominates, so the rules become a
+    single function with one ``if`` per rule.
+    """
+    constants = {}
+    lines = [
+        "def apply(profile, scan, sentiment_score, keywords):",
+        "    profile_terms = scan.terms['profile']",
+        "    summary_terms = scan.terms['summary']",
+        "    fired = []",
+    ]
+    for index, (message, conditions) in enumerate(rules):
+        constants[f"_message{index}"] = message
+        test = ' and '.join(_condition_source(condition, constants) for condition in conditions)
+        lines.append(f"    if {test}:")
+        lines.append(f"        fired.append(_message{index})")
+    lines.append("    return fired")
+
+    namespace = dict(constants)
+    exec(compile('\n'.join(lines), '<rules>', 'exec'), namespace)
+    return namespace['apply']
+
+
+class RuleSet:
+    """A list of rules compiled into a single function"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self._apply = _compile_rules(rules)
+
+    def apply(self, profile, scan, sentiment_score=None, keywords=()):
+        """Messages of every rule whose conditions all hold, in rule order"""
+        return self._apply(profile, scan, sentiment_score, keywords)
+
+
+STRENGTHS = RuleSet(STRENGTH_RULES)
+IMPROVEMENTS = RuleSet(IMPROVEMENT_RULES)
+SUGGESTIONS = RuleSet(SUGGESTION_RULES)
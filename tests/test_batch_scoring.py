@@ -0,0 +1,48 @@
+"""score_batch must give the same score as app.calculate_profile_score for every row"""
+import os
+import random
+import tempfile
+
+import numpy as np
+
+# Importing the app opens its SQLite files; keep them out of the working tree
+_workdir = tempfile.mkdtemp(prefix='linkedin-tests-')
+for name in ('JOBS_DB', 'ANALYSIS_DB', 'RATE_LIMIT_DB'):
+    os.environ.setdefault(name, os.path.join(_workdir, name.lower() + '.sqlite'))
+
+from app import calculate_profile_score
+from batch_scoring import score_batch, score_rows
+from rules import SCORE_REQUIREMENTS
+
+
+def random_row(rng):
+    lengths = {}
+    for section, requirements in SCORE_REQUIREMENTS.items():
+        # Around the threshold, where the partial points and rounding happen
+        lengths[section] = rng.choice((0, rng.randint(0, requirements['length'] * 2)))
+    return lengths, rng.randint(0, 8), rng.randint(0, 8)
+
+
+def test_score_batch_matches_calculate_profile_score():
+    rng = random.Random(18)
+    rows = [random_row(rng) for _ in range(5000)]
+    section_lengths = {section: np.array([row[0][section] for row in rows]) for section in SCORE_REQUIREMENTS}
+    scores = score_batch(section_lengths, [row[1] for row in rows], [row[2] for row in rows])
+
+    for (lengths, strengths, improvements), score in zip(rows, scores):
+        analysis = {section: 'x' * length for section, length in lengths.items()}
+        analysis['strengths'] = ['s'] * strengths
+        analysis['improvements'] = ['i'] * improvements
+        assert score == calculate_profile_score(analysis), (lengths, strengths, improvements)
+
+
+def test_score_rows_reads_lengths_and_text():
+    rows = [
+        {'headline_length': '5', 'summary': 'x' * 150, 'strengths': '2', 'improvements': ''},
+        {'experience': 'x' * 100, 'skills': 'y' * 25, 'improvements': '7'},
+    ]
+    expected = [
+        calculate_profile_score({'headline': 'x' * 5, 'summary': 'x' * 150, 'strengths': ['s'] * 2}),
+        calculate_profile_score({'experience': 'x' * 100, 'skills': 'y' * 25, 'improvements': ['i'] * 7}),
+    ]
+    assert score_rows(rows).tolist() == expected
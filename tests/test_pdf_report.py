@@ -0,0 +1,34 @@
+"""Bulk PDF exports with user text in the report names"""
+import io
+import os
+
+from pypdf import PdfReader
+
+import pdf_report
+
+
+def analysis(name):
+    return {
+        'name': name, 'score': 70, 'strengths': ['Team <collaboration> & skills'], 'improvements': [],
+        'keywords': ['c++', 'r&d'], 'suggestions': ['Use <b> tags sparingly'],
+    }
+
+
+def test_combined_report_escapes_markup_in_names(monkeypatch):
+    monkeypatch.setattr(pdf_report, 'PDF_WORKERS', 0)
+    names = ['<b>Jane', 'Tom & Jerry', 'A </para> B']
+    path = pdf_report.render_combined([analysis(name) for name in names])
+    try:
+        reader = PdfReader(path)
+        assert [item.title for item in reader.outline] == [f"{index + 1}. {name}" for index, name in enumerate(names)]
+        contents = reader.pages[0].extract_text()
+        for name in names:
+            assert name in contents
+        assert len(reader.pages) == 1 + len(names)
+    finally:
+        os.remove(path)
+
+
+def test_single_report_escapes_markup_in_title():
+    pdf = pdf_report.build_report(analysis('x'), title='Report for <i>Jane & co')
+    assert 'Report for <i>Jane & co' in PdfReader(io.BytesIO(pdf)).pages[0].extract_text()
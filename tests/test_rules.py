@@ -0,0 +1,211 @@
+"""The compiled rule engine must give exactly the results of the original hand-written checks.
+
+``generate_suggestions`` and ``analyze_strengths_and_improvements`` below
+are verbatim copies of the functions in app.py before the rules became
+data. Do not edit them; a rule change that is meant to change the results
+has to change these copies and say so.
+"""
+import re
+import random
+import inspect
+import logging
+
+import rules
+from rules import SECTIONS, STRENGTHS, IMPROVEMENTS, SUGGESTIONS, scan_profile
+
+logger = logging.getLogger(__name__)
+
+
+# --- Baseline app.py, verbatim ---
+
+def generate_suggestions(profile, keywords):
+    try:
+        suggestions = []
+        text = profile['summary'].lower()
+        
+        # Content suggestions
+        if len(profile['summary']) < 200:
+            suggestions.append("Expand your professional summary to be more comprehensive")
+        if len(keywords) < 5:
+            suggestions.append("Include more industry-specific keywords in your profile")
+        if "achievement" not in text and "result" not in text:
+            suggestions.append("Add more quantifiable achievements to your experience")
+        
+        # Formatting suggestions
+        if len(profile['headline']) < 10:
+            suggestions.append("Make your headline more descriptive and impactful")
+        if len(profile['experience']) < 100:
+            suggestions.append("Add more detail to your work experience section")
+        if len(profile['skills']) < 50:
+            suggestions.append("Expand your skills section with more specific competencies")
+        
+        # Content quality suggestions
+        if "data" in text and "analytics" not in text:
+            suggestions.append("Consider adding data analytics experience if relevant")
+        if "cloud" in text and "aws" not in text and "azure" not in text:
+            suggestions.append("Specify cloud platforms you're familiar with")
+        if "agile" in text and "scrum" not in text:
+            suggestions.append("Mention specific agile methodologies you've used")
+        
+        # Industry-specific suggestions
+        if "tech" in text or "software" in text:
+            suggestions.append("Include specific programming languages and frameworks")
+        if "market" in text or "sales" in text:
+            suggestions.append("Add metrics about sales performance or market impact")
+        if "finance" in text or "account" in text:
+            suggestions.append("Mention financial software or tools you're familiar with")
+        
+        # Professional development suggestions
+        if "certification" not in text:
+            suggestions.append("Consider adding relevant professional certifications")
+        if "education" not in text or len(profile['education']) < 50:
+            suggestions.append("Expand your education section with relevant details")
+        
+        return suggestions
+    except Exception as e:
+        logger.error(f"Error in generate_suggestions: {str(e)}")
+        return ["Unable to generate suggestions"]
+
+def analyze_strengths_and_improvements(profile, sentiment_score):
+    try:
+        strengths = []
+        improvements = []
+        
+        # Combine all text sections for analysis
+        text = f"{profile['headline']} {profile['summary']} {profile['experience']} {profile['skills']} {profile['education']}".lower()
+        
+        # Professional strengths
+        if "leadership" in text or "manage" in text or "direct" in text:
+            strengths.append("Strong leadership and management experience")
+        if "project" in text or "program" in text:
+            strengths.append("Project and program management expertise")
+        if "technical" in text or "develop" in text or "engineer" in text:
+            strengths.append("Technical proficiency and development skills")
+        if "innov" in text or "creativ" in text:
+            strengths.append("Innovative and creative problem-solving abilities")
+        if "communicat" in text or "present" in text:
+            strengths.append("Strong communication and presentation skills")
+        if "team" in text or "collaborat" in text:
+            strengths.append("Team collaboration and interpersonal skills")
+        if "analyt" in text or "research" in text:
+            strengths.append("Analytical and research capabilities")
+        if "strateg" in text or "plan" in text:
+            strengths.append("Strategic planning and execution")
+        
+        # Education-based strengths
+        if "degree" in text or "bachelor" in text or "master" in text or "phd" in text:
+            strengths.append("Strong educational background")
+        if "certification" in text or "certified" in text:
+            strengths.append("Professional certifications and qualifications")
+        
+        # Experience-based strengths
+        if "experience" in text and len(profile['experience']) > 100:
+            strengths.append("Comprehensive work experience")
+        if "achievement" in text or "result" in text:
+            strengths.append("Track record of achievements and results")
+        
+        # Identify areas for improvement
+        if "certification" not in text and "certified" not in text:
+            improvements.append("Consider adding relevant professional certifications")
+        if "volunteer" not in text and "community" not in text:
+            improvements.append("Include volunteer work or community involvement")
+        if "mentor" not in text and "teach" not in text:
+            improvements.append("Add mentoring or teaching experience")
+        if "achievement" not in text and "result" not in text:
+            improvements.append("Include more quantifiable achievements and results")
+        if "skill" not in text and "expertise" not in text:
+            improvements.append("Add more specific skills and areas of expertise")
+        if "network" not in text and "connect" not in text:
+            improvements.append("Highlight your professional network and connections")
+        if "goal" not in text and "objective" not in text:
+            improvements.append("Add your career goals and objectives")
+        
+        # Section-specific improvements
+        if len(profile['headline']) < 10:
+            improvements.append("Make your headline more descriptive and impactful")
+        if len(profile['experience']) < 100:
+            improvements.append("Add more detail to your work experience section")
+        if len(profile['skills']) < 50:
+            improvements.append("Expand your skills section with more specific competencies")
+        if len(profile['education']) < 50:
+            improvements.append("Expand your education section with more relevant details")
+        
+        # Add sentiment-based suggestions
+        if sentiment_score < 3:
+            improvements.append("Consider using more positive and confident language")
+        elif sentiment_score > 4:
+            strengths.append("Strong positive and confident tone")
+        
+        return strengths, improvements
+    except Exception as e:
+        logger.error(f"Error in analyze_strengths_and_improvements: {str(e)}")
+        return [], []
+
+# --- End of baseline ---
+
+
+def rule_terms(conditions):
+    for condition in conditions:
+        if condition[0] in ('has', 'lacks'):
+            yield from condition[2]
+        elif condition[0] == 'either':
+            yield from rule_terms(condition[1])
+
+
+# Terms the compiled engine looks for
+TERMS = sorted({
+    term
+    for rule_list in (rules.STRENGTH_RULES, rules.IMPROVEMENT_RULES, rules.SUGGESTION_RULES)
+    for _, conditions in rule_list
+    for term in rule_terms(conditions)
+})
+# Terms the baseline looks for, so random profiles exercise both
+BASELINE_TERMS = sorted(set(re.findall(
+    r'"(\w+)" (?:not )?in text',
+    inspect.getsource(generate_suggestions) + inspect.getsource(analyze_strengths_and_improvements)
+)))
+WORD_TERMS = sorted(set(TERMS) | set(BASELINE_TERMS))
+FILLER = ['the', 'and', 'of', 'led', 'x', 'ing', 'ment', 'ed', 'co', 'ion']
+
+
+def random_word(rng):
+    # Glue terms and fragments together so terms overlap and nest inside one token
+    parts = [rng.choice(WORD_TERMS) if rng.random() < 0.3 else rng.choice(FILLER) for _ in range(rng.randint(1, 3))]
+    word = ''.join(parts)
+    if rng.random() < 0.3:
+        word = word[rng.randint(0, len(word) - 1):]
+    return word.upper() if rng.random() < 0.1 else word
+
+
+def random_profile(rng):
+    return {
+        section: ' '.join(random_word(rng) for _ in range(rng.choice((0, 1, 2, 4, 12))))
+        for section in SECTIONS
+    }
+
+
+def test_rule_sets_match_baseline():
+    rng = random.Random(7)
+    for _ in range(3000):
+        profile = random_profile(rng)
+        sentiment_score = rng.choice((1, 2, 3, 4, 5))
+        keywords = ['k'] * rng.randint(0, 8)
+        scan = scan_profile(profile)
+        strengths, improvements = analyze_strengths_and_improvements(profile, sentiment_score)
+        assert STRENGTHS.apply(profile, scan, sentiment_score) == strengths, profile
+        assert IMPROVEMENTS.apply(profile, scan, sentiment_score) == improvements, profile
+        assert SUGGESTIONS.apply(profile, scan, keywords=keywords) == generate_suggestions(profile, keywords), profile
+
+
+def test_rules_use_the_baseline_terms():
+    assert TERMS == BASELINE_TERMS
+
+
+def test_token_terms_match_substring_search():
+    rng = random.Random(11)
+    tokens = [random_word(rng).lower() for _ in range(20000)]
+    # Every term run into every term it overlaps with, the case the regex alone misses
+    tokens += [term + other[i:] for term in TERMS for other in TERMS
+               for i in range(1, min(len(term), len(other))) if term.endswith(other[:i])]
+    for token in tokens:
+        assert rules._token_terms(token) == {term for term in TERMS if term in token}, token
@@ -0,0 +1,132 @@
+"""Preparing long profile text for the models, and merging what they return.
+
+Each model only looks at the first ``max_input_tokens`` tokens or so of
+an input. Text longer than that is split into chunks that fit, along
+section and sentence boundaries, with whitespace collapsed so that
+indentation does not use up the window. Every chunk is analyzed on its
+own and the per-chunk results are merged back into the single result the
+pipeline expects, in the same HuggingFace shape. Text that fits the
+window is sent whole, as one call.
+"""
+import os
+import re
+import logging
+
+from local_nlp import split_sentences
+
+logger = logging.getLogger(__name__)
+
+# Chunking configuration
+# Input window of models that do not declare max_input_tokens
+CHUNK_TOKEN_BUDGET = int(os.getenv('CHUNK_TOKEN_BUDGET', '256'))
+# Rough size of a model token in characters of English text
+CHARS_PER_TOKEN = 4
+# Most chunks one text is split into; text beyond them is not analyzed
+CHUNK_MAX_COUNT = int(os.getenv('CHUNK_MAX_COUNT', '8'))
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_whitespace(text):
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def input_tokens(spec):
+    """Input window of a registry model, in tokens"""
+    return (spec.max_input_tokens if spec is not None else None) or CHUNK_TOKEN_BUDGET
+
+
+def window_chars(spec):
+    """Input window of a registry model, in characters"""
+    return input_tokens(spec) * CHARS_PER_TOKEN
+
+
+def _pieces(sentence, max_chars):
+    """A sentence longer than the budget, cut between words"""
+    piece = ''
+    for word in sentence.split(' '):
+        while len(word) > max_chars:
+            if piece:
+                yield piece
+                piece = ''
+            yield word[:max_chars]
+            word = word[max_chars:]
+        if piece and len(piece) + 1 + len(word) > max_chars:
+            yield piece
+            piece = ''
+        piece = f"{piece} {word}" if piece else word
+    if piece:
+        yield piece
+
+
+def chunk_text(text, token_budget=None):
+    """Split text into chunks within the token budget, always returning at least one.
+
+    Lines, such as the sections of the combined profile text, and sentences
+    are kept whole where they fit; consecutive ones share a chunk.
+    """
+    max_chars = (token_budget or CHUNK_TOKEN_BUDGET) * CHARS_PER_TOKEN
+    chunks = []
+    current = ''
+    for sentence in split_sentences(text):
+        sentence = normalize_whitespace(sentence)
+        for piece in _pieces(sentence, max_chars) if len(sentence) > max_chars else (sentence,):
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = ''
+            current = f"{current} {piece}" if current else piece
+    if current or not chunks:
+        chunks.append(current)
+
+    if len(chunks) > CHUNK_MAX_COUNT:
+        logger.debug("Analyzing %s of %s chunks", CHUNK_MAX_COUNT, len(chunks))
+        chunks = chunks[:CHUNK_MAX_COUNT]
+    return chunks
+
+
+def merge_keywords(responses):
+    """Union of token classification results, keeping each word's best score"""
+    best = {}
+    for response in responses:
+        if not isinstance(response, list):
+            continue
+        for entity in response:
+            if isinstance(entity, str):
+                entity = {'word': entity, 'score': 0.0}
+            if not isinstance(entity, dict) or 'word' not in entity:
+                continue
+            kept = best.get(entity['word'])
+            if kept is None or entity.get('score', 0.0) > kept.get('score', 0.0):
+                best[entity['word']] = entity
+    return sorted(best.values(), key=lambda entity: -entity.get('score', 0.0))
+
+
+def top_label(response):
+    """Most likely label of a classification result.
+
+    The API answers [{label, score}, ...] or, for some models, [[{label, score}, ...]].
+    """
+    labels = response[0] if isinstance(response[0], list) else response
+    return max(labels, key=lambda label: label.get('score', 0.0))
+
+
+def merge_sentiment(responses, chunks):
+    """Star rating averaged over the chunks, weighted by their length"""
+    total = weight = 0.0
+    confidence = 0.0
+    for response, chunk in zip(responses, chunks):
+        label = top_label(response)
+        stars = float(label['label'].split()[0])
+        total += stars * max(len(chunk), 1)
+        weight += max(len(chunk), 1)
+        confidence += label.get('score', 0.0)
+    stars = round(total / weight, 2)
+    return [{'label': f"{stars:g} stars", 'score': confidence / len(responses)}]
+
+
+def summaries(responses):
+    """The summary text of each chunk's summarization result"""
+    return [response[0]['summary_text'] for response in responses]
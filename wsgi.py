@@ -0,0 +1,24 @@
+"""WSGI entry point for production servers:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With the settings in gunicorn.conf.py the application is imported once in
+the master process and shared by every forked worker.
+"""
+import time
+import logging
+
+from dotenv import load_dotenv
+
+_started = time.perf_counter()
+
+# Read .env before logging_config reads its settings
+load_dotenv()
+
+import logging_config
+logging_config.configure()
+
+from app import app
+
+logger = logging.getLogger(__name__)
+logger.info("Application loaded in %.0f ms", (time.perf_counter() - _started) * 1000)